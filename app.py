@@ -6,13 +6,28 @@ Generates LinkedIn post drafts in Zoran's voice from URLs and PDFs
 import os
 import re
 import json
+import time
 import logging
+import threading
 from flask import Flask, request, jsonify
 from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
 import anthropic
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from extractors import extract_from_url, extract_from_pdf, is_youtube_url, extract_from_youtube
-from prompts import get_system_prompt
+from prompts import get_system_prompt, get_voice, list_voices
+from voices import registry as voice_registry
+from summarizer import condense_content, SUMMARY_BUDGET_SECONDS, LONG_DOCUMENT_THRESHOLD
+from llm import create_message, get_hedge_stats
+from scheduler import Scheduler, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from resilience import Deadline, get_breaker, web_breaker_name, breaker_states, CircuitOpenError
+from job_status import JobStatusMessage
+from history import record_source, record_drafts, search_drafts, get_drafts, get_latest_drafts, get_thread_drafts
+from fingerprints import minhash_signature, find_near_duplicates, add_fingerprint
+from job_journal import (
+    start_job, record_status_ts, advance_job, fail_job, settle_job, find_job, start_recovery, job_counts,
+    MAX_JOB_ATTEMPTS, STAGE_QUEUED, STAGE_EXTRACTING, STAGE_CONDENSING, STAGE_AWAITING_VOICE,
+    STAGE_GENERATING, STAGE_DONE
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,15 +36,51 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 
 # Initialize clients
-slack_client = WebClient(token=os.environ.get("SLACK_BOT_TOKEN"))
+slack_client = WebClient(
+    token=os.environ.get("SLACK_BOT_TOKEN"),
+    timeout=int(os.environ.get("SLACK_TIMEOUT", 10))
+)
 claude_client = anthropic.Anthropic(api_key=os.environ.get("CLAUDE_API_KEY"))
 
+# Model used to write the drafts
+DRAFT_MODEL = "claude-sonnet-4-20250514"
+
+
+def count_prompt_tokens(prompt: str) -> int:
+    """Exact input token count of a system prompt"""
+    return claude_client.beta.messages.count_tokens(
+        model=DRAFT_MODEL,
+        system=prompt,
+        messages=[{"role": "user", "content": "-"}]
+    ).input_tokens
+
+
+# Voice prompts get exact token counts when they are (re)loaded
+voice_registry.token_counter = count_prompt_tokens
+
+# Background workers: interactive draft generation runs ahead of extraction
+scheduler = Scheduler(
+    workers=int(os.environ.get("SCHEDULER_WORKERS", 4)),
+    max_queue_depth=int(os.environ.get("SCHEDULER_MAX_QUEUE", 50)),
+    max_per_key=int(os.environ.get("SCHEDULER_MAX_PER_USER", 10))
+)
+
 # Store processed events to avoid duplicates
 processed_events = set()
 
 # Store pending content awaiting voice selection: {thread_ts: {"content": str, "source": str, "channel": str}}
+# (the job journal keeps a durable copy for restarts and other workers)
 pending_content = {}
 
+# Keys of pending content still being condensed in this process
+condensing = set()
+
+# How long a voice click waits for condensing to finish (summary budget plus slack)
+CONDENSE_WAIT_SECONDS = SUMMARY_BUDGET_SECONDS + 10
+
+# Store draft conversations for in-thread refinement: {"channel:thread_ts": {"system": str, "messages": list, ...}}
+conversations = {}
+
 
 def extract_urls(text):
     """Extract URLs from message text"""
@@ -43,55 +94,155 @@ def extract_urls(text):
     return urls
 
 
-def generate_linkedin_drafts(content: str, source_url: str = None, voice: str = "zoran") -> dict:
-    """Generate 2 LinkedIn post drafts using Claude"""
+def build_source_message(content: str, source_url: str, voice_name: str) -> str:
+    """First user message of a draft conversation (the cached prefix shared by variants and refinements)"""
+    return f"""Based on this content, create LinkedIn post drafts in {voice_name}.
+
+SOURCE CONTENT:
+{content[:LONG_DOCUMENT_THRESHOLD]}
+
+{f"Source URL: {source_url}" if source_url else ""}"""
+
+
+def generate_linkedin_drafts(content: str, source_url: str = None, voice: str = "zoran", deadline=None,
+                             on_variant=None, completed: dict = None) -> dict:
+    """
+    Generate LinkedIn post drafts using Claude, one concurrent request per variant
+    The voice decides how many variants and which angles; on_variant(drafts, texts, total)
+    is called with the drafts and the texts by variant name finished so far each time
+    a variant completes. Variants already in completed (from an interrupted run) are reused
+    """
 
     system_prompt = get_system_prompt(voice)
     
-    voice_name = "Zoran's voice" if voice == "zoran" else "VertoDigital's brand voice"
+    voice_config = get_voice(voice)
+    voice_name = voice_config["label"]
+    variants = voice_config["variants"]
 
-    user_message = f"""Based on this content, create 2 different LinkedIn post drafts in {voice_name}.
+    # Shared by every variant request (and later refinements), so it's cached once
+    source_message = build_source_message(content, source_url, voice_name)
 
-SOURCE CONTENT:
-{content[:8000]}  # Truncate if too long
+    source_block = {"type": "text", "text": source_message, "cache_control": {"type": "ephemeral"}}
 
-{f"Source URL: {source_url}" if source_url else ""}
+    # The cache write is only readable once a response has started, so the first
+    # request warms the cache and the rest are sent when its output begins
+    warmed = threading.Event()
 
----
+    def generate_variant(variant: dict, on_first_output=None) -> str:
+        variant_message = f"""---
 
-Create 2 distinct versions:
-- **Version A**: More insight-focused (lead with the key learning/observation)
-- **Version B**: More engagement-focused (end with a genuine question)
+Write **{variant['name']}**: {variant['angle']}
 
-For each version:
 1. Keep it under 200 words
 2. Use the appropriate language patterns for {voice_name}
 3. Tag relevant team members if their expertise applies
 4. Include a relevant social proof quote only if it fits naturally (don't force it)
 
-Format your response as:
-## Version A
-[post content]
+Reply with the post content only."""
 
-## Version B
-[post content]
-"""
-    
-    try:
-        response = claude_client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=2000,
+        return create_message(
+            claude_client,
+            model=DRAFT_MODEL,
+            max_tokens=700,
             system=system_prompt,
             messages=[
-                {"role": "user", "content": user_message}
+                {"role": "user", "content": [source_block, {"type": "text", "text": variant_message}]}
+            ],
+            deadline=deadline,
+            cache_prefix=True,
+            on_first_output=on_first_output
+        )
+
+    def warm_cache(variant: dict) -> str:
+        try:
+            return generate_variant(variant, on_first_output=warmed.set)
+        finally:
+            warmed.set()
+
+    def combine(texts: dict) -> str:
+        return '\n\n'.join(
+            f"## {variant['name']}\n{texts[variant['name']].strip()}"
+            for variant in variants
+            if variant['name'] in texts
+        )
+
+    texts = {name: text for name, text in (completed or {}).items() if any(v['name'] == name for v in variants)}
+    errors = []
+    remaining = [variant for variant in variants if variant['name'] not in texts]
+    executor = ThreadPoolExecutor(max_workers=max(1, len(remaining)))
+    futures = {}
+    if remaining:
+        futures[executor.submit(warm_cache, remaining[0])] = remaining[0]
+        if len(remaining) > 1:
+            warmed.wait()
+        futures.update({executor.submit(generate_variant, variant): variant for variant in remaining[1:]})
+    try:
+        for future in as_completed(futures):
+            variant = futures[future]
+            try:
+                texts[variant['name']] = future.result()
+            except Exception as e:
+                logger.error(f"Claude API error for {variant['name']}: {e}")
+                errors.append(str(e))
+                continue
+
+            if on_variant:
+                on_variant(combine(texts), dict(texts), len(variants))
+    finally:
+        executor.shutdown(wait=False)
+
+    if not texts:
+        return {
+            "success": False,
+            "error": errors[0] if errors else "No drafts generated"
+        }
+
+    drafts = combine(texts)
+    return {
+        "success": True,
+        "drafts": drafts,
+        "texts": texts,
+        # Variants that failed (the drafts are partial when this isn't empty)
+        "missing": [variant['name'] for variant in variants if variant['name'] not in texts],
+        "error": errors[0] if errors else None,
+        # Exact prefix for in-thread refinements to hit the prompt cache
+        "conversation": {
+            "system": system_prompt,
+            "messages": [
+                {"role": "user", "content": [{"type": "text", "text": source_message}]},
+                {"role": "assistant", "content": drafts}
             ]
+        }
+    }
+
+
+def refine_linkedin_drafts(conversation: dict, instruction: str, deadline=None) -> dict:
+    """
+    Revise drafts from a follow-up instruction, continuing the original conversation
+    The system prompt, source and earlier drafts are a cached prefix, so only the
+    instruction and the new output are paid for in full
+    """
+    messages = conversation["messages"] + [
+        {"role": "user", "content": f"{instruction}\n\nApply this to the drafts and reply with the revised drafts in the same format."}
+    ]
+
+    try:
+        drafts = create_message(
+            claude_client,
+            model=DRAFT_MODEL,
+            max_tokens=2000,
+            system=conversation["system"],
+            messages=messages,
+            deadline=deadline,
+            cache_prefix=True
         )
-        
+
+        conversation["messages"] = messages + [{"role": "assistant", "content": drafts}]
         return {
             "success": True,
-            "drafts": response.content[0].text
+            "drafts": drafts
         }
-        
+
     except Exception as e:
         logger.error(f"Claude API error: {e}")
         return {
@@ -100,21 +251,40 @@ Format your response as:
         }
 
 
-def send_slack_message(channel: str, text: str, thread_ts: str = None, blocks: list = None):
-    """Send a message to Slack"""
-    try:
-        slack_client.chat_postMessage(
-            channel=channel,
-            text=text,
-            thread_ts=thread_ts,
-            blocks=blocks
-        )
-    except SlackApiError as e:
-        logger.error(f"Slack API error: {e}")
+def new_job_status(channel: str, thread_ts: str = None, ts: str = None, on_post=None) -> JobStatusMessage:
+    """Status message for a job in a thread (attach to an existing message with ts)"""
+    return JobStatusMessage(slack_client, channel, thread_ts, ts, on_post)
+
+
+def job_status_for(job: dict) -> JobStatusMessage:
+    """Status message of a journaled job; its ts is journaled once posted, so a resumed job edits it"""
+    return new_job_status(
+        job["channel"], job["thread_ts"], job.get("status_ts"),
+        on_post=lambda ts: record_status_ts(job["id"], ts)
+    )
+
+
+def find_reusable_drafts(content: str, source_id: int, channel: str) -> dict:
+    """
+    Fingerprint new content and return drafts already made from a near-duplicate source
+    Only sources and drafts from the same channel are offered, so DMs and private channels stay private
+    """
+    signature = minhash_signature(content)
+    matches = find_near_duplicates(signature)
+    add_fingerprint(source_id, signature)
 
+    past = get_latest_drafts([match_id for match_id, _ in matches], channel)
+    if past:
+        past["similarity"] = dict(matches)[past["source_id"]]
+        logger.info(f"Source {source_id} matches source {past['source_id']} ({past['similarity']:.0%})")
+    return past
 
-def send_voice_selection_prompt(channel: str, thread_ts: str):
-    """Send interactive buttons to select voice"""
+
+def send_voice_selection_prompt(status: JobStatusMessage, reuse: dict = None):
+    """
+    Show interactive buttons to select voice in the job's status message
+    If drafts exist for a near-duplicate source, offer to reuse them too
+    """
     blocks = [
         {
             "type": "section",
@@ -131,31 +301,61 @@ def send_voice_selection_prompt(channel: str, thread_ts: str):
                     "type": "button",
                     "text": {
                         "type": "plain_text",
-                        "text": "🧑 Zoran's Voice",
-                        "emoji": True
-                    },
-                    "value": "zoran",
-                    "action_id": "select_zoran"
-                },
-                {
-                    "type": "button",
-                    "text": {
-                        "type": "plain_text",
-                        "text": "🏢 VertoDigital",
+                        "text": voice["button"],
                         "emoji": True
                     },
-                    "value": "vertodigital",
-                    "action_id": "select_vertodigital"
+                    "value": voice["id"],
+                    "action_id": f"select_{voice['id']}"
                 }
+                for voice in list_voices()
             ]
         }
     ]
-    send_slack_message(
-        channel,
-        "Which voice should I use for the LinkedIn drafts?",
-        thread_ts,
-        blocks
-    )
+
+    if reuse:
+        created = time.strftime("%Y-%m-%d", time.gmtime(reuse["created_at"]))
+        blocks.insert(1, {
+            "type": "context",
+            "elements": [{
+                "type": "mrkdwn",
+                "text": f"♻️ This looks like {reuse['source']} ({reuse['similarity']:.0%} similar), drafted on {created}."
+            }]
+        })
+        blocks[-1]["elements"].append({
+            "type": "button",
+            "text": {
+                "type": "plain_text",
+                "text": "♻️ Reuse Those Drafts",
+                "emoji": True
+            },
+            "value": str(reuse["id"]),
+            "action_id": "repost_drafts"
+        })
+
+    status.update("Which voice should I use for the LinkedIn drafts?", blocks)
+
+
+def pending_key(status: JobStatusMessage) -> str:
+    """Key of a job's content in pending_content"""
+    return f"{status.channel}:{status.ts or status.thread_ts}"
+
+
+def store_pending_content(status: JobStatusMessage, content: str, source: str, source_id: int = None):
+    """Keep extracted content until a voice is picked on the job's status message"""
+    pending_content[pending_key(status)] = {
+        "content": content,
+        "source": source,
+        "source_id": source_id,
+        "channel": status.channel,
+        "thread_ts": status.thread_ts
+    }
+
+    # Limit pending content cache size
+    if len(pending_content) > 100:
+        # Remove oldest entries
+        keys_to_remove = list(pending_content.keys())[:50]
+        for key in keys_to_remove:
+            del pending_content[key]
 
 
 @app.route("/", methods=["GET"])
@@ -164,70 +364,435 @@ def health_check():
     return jsonify({"status": "ok", "service": "VertoVoice Bot"})
 
 
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Scheduler, hedging, circuit breaker and voice metrics"""
+    return jsonify({
+        "scheduler": scheduler.metrics(),
+        "hedging": get_hedge_stats(),
+        "circuit_breakers": breaker_states(),
+        "voices": voice_registry.summary(),
+        "jobs": job_counts()
+    })
+
+
+def schedule_job(priority: int, channel: str, user: str, status: JobStatusMessage, func, *args):
+    """
+    Queue work for a channel/user and tell them politely if it has to wait
+    The job receives the status message so queue notices and progress share it
+    Returns the queue position, or None if the job was turned away
+    """
+    revision = status.revision
+    position = scheduler.submit(priority, f"{channel}:{user}", func, *args, status=status)
+
+    if position is None:
+        status.update("⏳ I'm at capacity right now. Please share it again in a few minutes.")
+    elif position > 0:
+        # A worker may have picked the job up already; don't overwrite its progress
+        status.update(
+            f"⏳ Busy right now, queued at position {position}. I'll get to it shortly!",
+            unless_updated_since=revision
+        )
+
+    return position
+
+
+def start_source_job(kind: str, channel: str, user: str, thread_ts: str, payload: dict):
+    """Journal and queue the extraction of one shared URL or PDF"""
+    job = start_job(kind, channel, user, thread_ts, payload)
+    if schedule_job(PRIORITY_BACKGROUND, channel, user, job_status_for(job), run_job, job) is None:
+        fail_job(job["id"], "Queue full")
+
+
+def resume_job(job: dict):
+    """Queue a job that a stopped worker left unfinished, editing its existing status message"""
+    status = job_status_for(job)
+
+    if job["attempts"] > MAX_JOB_ATTEMPTS:
+        fail_job(job["id"], f"Interrupted {MAX_JOB_ATTEMPTS} times")
+        status.update("❌ Sorry, I kept getting interrupted working on this. Please share it again.")
+        return
+
+    priority = PRIORITY_INTERACTIVE if job["stage"] == STAGE_GENERATING else PRIORITY_BACKGROUND
+    if schedule_job(priority, job["channel"], job["user"], status, run_job, job) is None:
+        fail_job(job["id"], "Queue full")
+
+
+def run_job(job: dict, status: JobStatusMessage):
+    """
+    Run a journaled job from its last recorded stage
+    Each stage's results are journaled as it finishes, so a resumed job skips work already done
+    """
+    job_id = job["id"]
+    state = job["state"]
+
+    try:
+        if job["stage"] == STAGE_GENERATING:
+            write_drafts(state, state["voice"], status, job_id, Deadline())
+            return
+
+        deadline = Deadline()
+
+        if job["stage"] in (STAGE_QUEUED, STAGE_EXTRACTING):
+            advance_job(job_id, STAGE_EXTRACTING)
+            extract = process_url if job["kind"] == "url" else process_pdf
+            extracted = extract(status, job["payload"], deadline)
+            if not extracted:
+                return
+            state.update(extracted)
+            advance_job(job_id, STAGE_CONDENSING, **extracted)
+
+        # Ask for voice selection right away; a click waits for condensing to finish
+        send_voice_selection_prompt(status, state.get("reuse"))
+
+        # Condense long documents while the user picks a voice
+        key = pending_key(status)
+        condensing.add(key)
+        try:
+            content = condense_content(state["content"], claude_client, deadline)
+            advance_job(job_id, STAGE_AWAITING_VOICE, content=content)
+
+            # Store content for later processing
+            store_pending_content(status, content, state["source"], state["source_id"])
+        finally:
+            condensing.discard(key)
+    finally:
+        # Jobs that stopped on an error they already reported are failed
+        settle_job(job_id)
+
+
 @app.route("/slack/interactivity", methods=["POST"])
 def slack_interactivity():
     """Handle Slack interactive components (button clicks)"""
     payload = json.loads(request.form.get("payload", "{}"))
+    dispatch_interaction(payload)
+    return jsonify({"status": "ok"})
+
 
+def dispatch_interaction(payload: dict):
+    """Route an interactivity payload (shared by the HTTP and Socket Mode transports)"""
     if payload.get("type") == "block_actions":
         actions = payload.get("actions", [])
         if actions:
             action = actions[0]
             action_id = action.get("action_id", "")
-            voice = action.get("value", "zoran")
 
-            # Get context from payload
             channel = payload.get("channel", {}).get("id")
+            user = payload.get("user", {}).get("id")
+
+            # Re-post past drafts: search results go to the channel, reuse offers
+            # replace the voice buttons in their thread
+            if action_id == "repost_drafts":
+                message = payload.get("message")
+                if message and not payload.get("container", {}).get("is_ephemeral"):
+                    status = new_job_status(channel, message.get("thread_ts") or message.get("ts"), message.get("ts"))
+                else:
+                    status = new_job_status(channel)
+                schedule_job(
+                    PRIORITY_INTERACTIVE, channel, user, status,
+                    handle_repost, int(action.get("value", 0))
+                )
+                return
+
+            # Retrying failed variants goes through the same path as picking a voice
+            if not action_id.startswith("select_") and action_id != "retry_variants":
+                return
+
+            voice = action.get("value", "zoran")
+
+            # Get context from payload (the buttons live in the job's status message)
             message_ts = payload.get("message", {}).get("ts")
             thread_ts = payload.get("message", {}).get("thread_ts") or message_ts
 
-            # Look up pending content
-            pending_key = f"{channel}:{thread_ts}"
-            pending = pending_content.get(pending_key)
+            status = new_job_status(channel, thread_ts, message_ts)
+            schedule_job(
+                PRIORITY_INTERACTIVE, channel, user, status,
+                handle_voice_selected, voice
+            )
 
-            if pending:
-                # Remove from pending
-                del pending_content[pending_key]
 
-                # Send "generating" message
-                voice_label = "Zoran's voice" if voice == "zoran" else "VertoDigital's brand voice"
-                send_slack_message(
-                    channel,
-                    f"✨ Generating drafts in {voice_label}...",
-                    thread_ts
-                )
+def format_drafts_message(drafts: str, voice_label: str, source: str = None) -> str:
+    """Message text for a finished set of drafts"""
+    source_text = f"\n_Source: {source}_" if source else ""
+    return f"""✨ *Here are your LinkedIn post drafts ({voice_label}):*
 
-                # Generate drafts
-                result = generate_linkedin_drafts(
-                    pending["content"],
-                    pending.get("source"),
-                    voice
-                )
+{drafts}
+
+---{source_text}
+_Edit as needed, then post!_"""
+
+
+def handle_voice_selected(voice: str, status: JobStatusMessage):
+    """Generate drafts for pending content once a voice has been picked"""
+    channel = status.channel
+
+    # Fail fast while Claude is known to be down, keeping the content for a retry
+    claude_breaker = get_breaker("claude")
+    if claude_breaker.is_open():
+        status.update(f"⚠️ {claude_breaker.outage_message()}")
+        return
+
+    deadline = Deadline()
+
+    # The buttons appear before long content is condensed, so wait for it if needed
+    key = pending_key(status)
+    wait = Deadline(CONDENSE_WAIT_SECONDS)
+    pending, job = claim_pending_content(status, voice)
+    waiting = False
+    while (pending is None and not wait.expired()
+           and (key in condensing or (job and job["stage"] == STAGE_CONDENSING))):
+        if not waiting:
+            status.update("📖 Still reading the document, the drafts will start in a moment...")
+            waiting = True
+        time.sleep(0.5)
+        pending, job = claim_pending_content(status, voice)
+
+    job_id = job["id"] if job else None
+    if job and job["stage"] == STAGE_GENERATING and not pending:
+        # Another click is already generating these drafts
+        return
+
+    if not pending:
+        status.update("❌ Sorry, I couldn't find the content for this request. Please share the link or file again.")
+        return
+
+    try:
+        write_drafts(pending, voice, status, job_id, deadline)
+    finally:
+        settle_job(job_id)
+
+
+def claim_pending_content(status: JobStatusMessage, voice: str) -> tuple:
+    """
+    Take the content waiting on a status message's voice buttons
+    Returns (pending, job); the journal has it after a restart or if another worker extracted it
+    A journaled job is only claimed by moving it to generating, so pending is None when
+    another click or worker got there first, even if this process still holds the content
+    """
+    pending = pending_content.pop(pending_key(status), None)
+
+    job = find_job(status.channel, status.ts)
+    if job:
+        if not advance_job(job["id"], STAGE_GENERATING, expect=STAGE_AWAITING_VOICE, voice=voice):
+            return None, job
+        pending = pending or job["state"]
+    return pending, job
+
+
+def write_drafts(pending: dict, voice: str, status: JobStatusMessage, job_id: int, deadline: Deadline):
+    """Generate drafts for extracted content, journaling each variant as it finishes"""
+    # Show "generating" (this also removes the voice buttons)
+    voice_label = get_voice(voice)["label"]
+    if not pending.get("variants"):
+        status.update(f"✨ Generating drafts in {voice_label}...")
+
+    # Show each variant as soon as it's ready
+    def show_progress(drafts: str, texts: dict, total: int):
+        advance_job(job_id, STAGE_GENERATING, variants=texts)
+        if len(texts) < total:
+            status.update(f"{drafts}\n\n_✨ Generating the rest in {voice_label}... ({len(texts)}/{total} ready)_")
+
+    # Generate drafts (variants finished before an interruption are reused)
+    result = generate_linkedin_drafts(
+        pending["content"],
+        pending.get("source"),
+        voice,
+        deadline,
+        on_variant=show_progress,
+        completed=pending.get("variants")
+    )
+
+    if not result["success"]:
+        status.update(f"❌ Error generating drafts: {result['error']}")
+    elif result["missing"]:
+        # Keep the finished variants so a retry only writes the missing ones
+        advance_job(job_id, STAGE_AWAITING_VOICE, voice=voice, variants=result["texts"])
+        pending_content[pending_key(status)] = {**pending, "variants": result["texts"]}
+        send_partial_drafts(status, result, voice, voice_label, pending.get("source"))
+    else:
+        record_drafts(pending.get("source_id"), status.channel, status.thread_ts, voice, result["drafts"])
+        store_conversation(status, voice, pending.get("source_id"), result["conversation"])
+        status.update(format_drafts_message(result["drafts"], voice_label, pending.get("source")))
+        advance_job(job_id, STAGE_DONE)
+
+
+def send_partial_drafts(status: JobStatusMessage, result: dict, voice: str, voice_label: str, source: str = None):
+    """Show the variants that finished, say which failed, and offer to retry just those"""
+    missing = ", ".join(result["missing"])
+    text = format_drafts_message(result["drafts"], voice_label, source)
+    note = f"⚠️ Couldn't write {missing}: {result['error']}"
+
+    # Section blocks hold at most 3000 characters, so split on paragraphs
+    blocks = []
+    chunk = ""
+    for paragraph in text.split("\n\n"):
+        if chunk and len(chunk) + len(paragraph) + 2 > 3000:
+            blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": chunk}})
+            chunk = ""
+        chunk = f"{chunk}\n\n{paragraph}" if chunk else paragraph[:3000]
+    blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": chunk}})
+
+    blocks.append({"type": "context", "elements": [{"type": "mrkdwn", "text": note}]})
+    blocks.append({
+        "type": "actions",
+        "block_id": "retry_variants",
+        "elements": [{
+            "type": "button",
+            "text": {"type": "plain_text", "text": f"🔁 Retry {missing}", "emoji": True},
+            "value": voice,
+            "action_id": "retry_variants"
+        }]
+    })
+
+    status.update(f"{text}\n\n{note}", blocks)
+
+
+def store_conversation(status: JobStatusMessage, voice: str, source_id: int, conversation: dict):
+    """Remember a thread's draft conversation so replies can refine it"""
+    conversations[f"{status.channel}:{status.thread_ts}"] = {
+        **conversation,
+        "voice": voice,
+        "source_id": source_id
+    }
+
+    # Limit conversation cache size
+    if len(conversations) > 100:
+        # Remove oldest entries
+        keys_to_remove = list(conversations.keys())[:50]
+        for key in keys_to_remove:
+            del conversations[key]
+
+
+def load_conversation(channel: str, thread_ts: str) -> dict:
+    """
+    Return a thread's draft conversation, rebuilding it from history when this process
+    doesn't hold it (after a restart, or when the reply reaches another worker)
+    The rebuilt conversation is the source and the latest drafts; for long documents the
+    source is the stored text rather than the digest the drafts were written from
+    """
+    conversation = conversations.get(f"{channel}:{thread_ts}")
+    if conversation:
+        return conversation
+
+    past = get_thread_drafts(channel, thread_ts)
+    if not past or not past.get("content"):
+        return None
+
+    voice = get_voice(past["voice"])
+    source_message = build_source_message(past["content"], past.get("source"), voice["label"])
+    status = new_job_status(channel, thread_ts)
+    store_conversation(status, voice["id"], past["source_id"], {
+        "system": voice["prompt"],
+        "messages": [
+            {"role": "user", "content": [{"type": "text", "text": source_message}]},
+            {"role": "assistant", "content": past["drafts"]}
+        ]
+    })
+    return conversations.get(f"{channel}:{thread_ts}")
+
+
+def handle_refinement(event, status: JobStatusMessage):
+    """Revise a thread's drafts from a reply (e.g. shorter, more punchy, tag the SEO lead)"""
+    channel = event.get("channel")
+    conversation = load_conversation(channel, event.get("thread_ts"))
+    if not conversation:
+        status.update("⚠️ These drafts can no longer be refined. Share the link or PDF again to start over.")
+        return
 
-                if result["success"]:
-                    source_text = f"\n_Source: {pending['source']}_" if pending.get("source") else ""
-                    response_text = f"""✨ *Here are 2 LinkedIn post drafts ({voice_label}):*
+    claude_breaker = get_breaker("claude")
+    if claude_breaker.is_open():
+        status.update(f"⚠️ {claude_breaker.outage_message()}")
+        return
+
+    status.update("✏️ Revising the drafts...")
+
+    result = refine_linkedin_drafts(conversation, event.get("text", ""), Deadline())
+
+    if result["success"]:
+        voice_label = get_voice(conversation["voice"])["label"]
+        record_drafts(conversation.get("source_id"), channel, status.thread_ts, conversation["voice"], result["drafts"])
+        status.update(f"""✏️ *Revised drafts ({voice_label}):*
 
 {result['drafts']}
 
----{source_text}
-_Edit as needed, then post!_"""
+---
+_Reply in this thread to keep refining._""")
+    else:
+        status.update(f"❌ Error revising drafts: {result['error']}")
 
-                    send_slack_message(channel, response_text, thread_ts)
-                else:
-                    send_slack_message(
-                        channel,
-                        f"❌ Error generating drafts: {result['error']}",
-                        thread_ts
-                    )
-            else:
-                send_slack_message(
-                    channel,
-                    "❌ Sorry, I couldn't find the content for this request. Please share the link or file again.",
-                    thread_ts
-                )
 
-    return jsonify({"status": "ok"})
+def handle_repost(draft_id: int, status: JobStatusMessage):
+    """Post past drafts again without regenerating them"""
+    past = get_drafts(draft_id, status.channel)
+    if not past:
+        status.update("❌ Sorry, I couldn't find those drafts anymore.")
+        return
+
+    # Drafts are reused instead of generated, so drop any content waiting on a voice
+    if status.ts:
+        pending_content.pop(f"{status.channel}:{status.ts}", None)
+        job = find_job(status.channel, status.ts)
+        if job:
+            advance_job(job["id"], STAGE_DONE, expect=STAGE_AWAITING_VOICE)
+
+    voice_label = get_voice(past["voice"])["label"]
+    status.update(format_drafts_message(past["drafts"], voice_label, past["source"]))
+
+
+@app.route("/slack/commands", methods=["POST"])
+def slack_commands():
+    """Handle slash commands"""
+    return jsonify(dispatch_slash_command(request.form.to_dict()))
+
+
+def dispatch_slash_command(payload: dict) -> dict:
+    """
+    Answer a slash command (shared by the HTTP and Socket Mode transports)
+    /drafts <words> searches past sources and drafts
+    """
+    query = payload.get("text", "").strip()
+    if not query:
+        return {
+            "response_type": "ephemeral",
+            "text": "Usage: `/drafts <words>`, e.g. `/drafts ABM pipeline`"
+        }
+
+    # Only drafts made in this channel (or DM), so nothing leaks between channels
+    results = search_drafts(query, payload.get("channel_id"))
+    if not results:
+        return {
+            "response_type": "ephemeral",
+            "text": f"No past drafts in this channel match _{query}_."
+        }
+
+    blocks = [
+        {
+            "type": "section",
+            "text": {"type": "mrkdwn", "text": f"🔎 Past drafts matching _{query}_:"}
+        }
+    ]
+    for result in results:
+        created = time.strftime("%Y-%m-%d", time.gmtime(result["created_at"]))
+        preview = ' '.join(result["drafts"].split())[:200]
+        blocks.append({
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": f"*{result['source'] or 'Unknown source'}* · {result['voice']} · {created}\n>{preview}..."
+            },
+            "accessory": {
+                "type": "button",
+                "text": {"type": "plain_text", "text": "Re-post", "emoji": True},
+                "value": str(result["id"]),
+                "action_id": "repost_drafts"
+            }
+        })
+
+    return {
+        "response_type": "ephemeral",
+        "text": f"Past drafts matching {query}",
+        "blocks": blocks
+    }
 
 
 @app.route("/slack/events", methods=["POST"])
@@ -239,14 +804,19 @@ def slack_events():
     if data.get("type") == "url_verification":
         return jsonify({"challenge": data.get("challenge")})
     
-    # Handle events
+    dispatch_event_callback(data)
+    return jsonify({"status": "ok"})
+
+
+def dispatch_event_callback(data: dict):
+    """Route an event_callback body (shared by the HTTP and Socket Mode transports)"""
     if data.get("type") == "event_callback":
         event = data.get("event", {})
         event_id = data.get("event_id")
         
         # Avoid processing duplicate events
         if event_id in processed_events:
-            return jsonify({"status": "ok"})
+            return
         processed_events.add(event_id)
         
         # Limit cache size
@@ -255,162 +825,130 @@ def slack_events():
         
         event_type = event.get("type")
         
-        # Handle link shares
+        channel = event.get("channel")
+        user = event.get("user")
+
+        # Handle link shares (each link is its own job, journaled so it survives restarts)
         if event_type == "link_shared":
-            handle_link_shared(event)
+            for link in event.get("links", []):
+                if link.get("url"):
+                    start_source_job("url", channel, user, event.get("message_ts"), {"url": link["url"]})
         
         # Handle messages with files
         elif event_type == "message":
             # Ignore bot messages
             if event.get("bot_id"):
-                return jsonify({"status": "ok"})
+                return
             
-            # Check for file attachments
+            # Check for PDF attachments
             files = event.get("files", [])
-            if files:
-                handle_file_shared(event, files)
+            for file in files:
+                if file.get("filetype", "").lower() == "pdf" and file.get("url_private_download"):
+                    start_source_job("pdf", channel, user, event.get("ts"), {
+                        "url": file["url_private_download"],
+                        "name": file.get("name", "document.pdf")
+                    })
             
             # Check for URLs in message text
             text = event.get("text", "")
             urls = extract_urls(text)
-            if urls:
-                handle_urls_in_message(event, urls)
-    
-    return jsonify({"status": "ok"})
-
-
-def handle_link_shared(event):
-    """Handle link_shared events"""
-    channel = event.get("channel")
-    links = event.get("links", [])
-    message_ts = event.get("message_ts")
-    
-    for link in links:
-        url = link.get("url")
-        if url:
-            process_url(channel, url, message_ts)
+            for url in urls:
+                start_source_job("url", channel, user, event.get("ts"), {"url": url})
+
+            # Plain replies in a thread with drafts (here or in history) refine them
+            thread_ts = event.get("thread_ts")
+            if (not files and not urls and text.strip() and event.get("subtype") is None and thread_ts
+                    and (f"{channel}:{thread_ts}" in conversations or get_thread_drafts(channel, thread_ts))):
+                schedule_job(
+                    PRIORITY_INTERACTIVE, channel, user, new_job_status(channel, thread_ts),
+                    handle_refinement, event
+                )
 
 
-def handle_urls_in_message(event, urls):
-    """Handle URLs found in regular messages"""
-    channel = event.get("channel")
-    thread_ts = event.get("ts")
-    
-    for url in urls:
-        process_url(channel, url, thread_ts)
+def process_url(status: JobStatusMessage, payload: dict, deadline: Deadline) -> dict:
+    """Extract a shared URL; returns the content and its history record, or None once the problem is reported"""
+    url = payload["url"]
+    youtube = is_youtube_url(url)
 
-
-def process_url(channel: str, url: str, thread_ts: str = None):
-    """Process a URL and ask for voice selection"""
+    # Fail fast while the source is known to be down
+    breaker = get_breaker("gemini" if youtube else web_breaker_name(url))
+    if breaker.is_open():
+        status.update(f"⚠️ {breaker.outage_message()}")
+        return None
 
     # Check if it's a YouTube URL
-    if is_youtube_url(url):
-        # Send "analyzing video" message
-        send_slack_message(
-            channel,
-            "🎬 Got a YouTube video! Analyzing with Gemini AI (this may take a moment)...",
-            thread_ts
-        )
+    if youtube:
+        status.update("🎬 Got a YouTube video! Analyzing with Gemini AI (this may take a moment)...")
 
         # Extract content from YouTube using Gemini
-        result = extract_from_youtube(url)
+        result = extract_from_youtube(url, deadline)
 
         if result.get("error"):
-            send_slack_message(
-                channel,
-                f"❌ Couldn't analyze the YouTube video: {result['error']}",
-                thread_ts
-            )
-            return
+            status.update(f"❌ Couldn't analyze the YouTube video: {result['error']}")
+            return None
 
         content = result.get("content")
         if not content:
-            send_slack_message(
-                channel,
-                "❌ Couldn't extract content from that YouTube video. Make sure it's a public video.",
-                thread_ts
-            )
-            return
+            status.update("❌ Couldn't extract content from that YouTube video. Make sure it's a public video.")
+            return None
     else:
-        # Send "extracting" message for regular URLs
-        send_slack_message(
-            channel,
-            "📝 Extracting content from the URL...",
-            thread_ts
-        )
+        status.update("📝 Extracting content from the URL...")
 
         # Extract content from regular URL
-        content = extract_from_url(url)
+        content = extract_from_url(url, deadline)
 
         if not content:
-            send_slack_message(
-                channel,
-                "❌ Couldn't extract content from that URL. Try sharing a different link or uploading a PDF.",
-                thread_ts
-            )
-            return
+            status.update("❌ Couldn't extract content from that URL. Try sharing a different link or uploading a PDF.")
+            return None
 
-    # Store content for later processing
-    pending_key = f"{channel}:{thread_ts}"
-    pending_content[pending_key] = {
+    source_id = record_source(status.channel, status.thread_ts, url, content)
+    return {
         "content": content,
         "source": url,
-        "channel": channel
+        "source_id": source_id,
+        "reuse": find_reusable_drafts(content, source_id, status.channel)
     }
 
-    # Limit pending content cache size
-    if len(pending_content) > 100:
-        # Remove oldest entries
-        keys_to_remove = list(pending_content.keys())[:50]
-        for key in keys_to_remove:
-            del pending_content[key]
 
-    # Ask for voice selection
-    send_voice_selection_prompt(channel, thread_ts)
-
-
-def handle_file_shared(event, files):
-    """Handle file uploads (PDFs)"""
-    channel = event.get("channel")
-    thread_ts = event.get("ts")
+def process_pdf(status: JobStatusMessage, payload: dict, deadline: Deadline) -> dict:
+    """Extract an uploaded PDF; returns the content and its history record, or None once the problem is reported"""
+    # Fail fast while Slack (which serves the download) is known to be down
+    breaker = get_breaker("slack")
+    if breaker.is_open():
+        status.update(f"⚠️ {breaker.outage_message()}")
+        return None
 
-    for file in files:
-        filetype = file.get("filetype", "").lower()
+    status.update("📝 Got the PDF! Extracting content...")
 
-        if filetype == "pdf":
-            # Send "extracting" message
-            send_slack_message(
-                channel,
-                "📝 Got the PDF! Extracting content...",
-                thread_ts
-            )
+    try:
+        content = extract_from_pdf(payload["url"], slack_client, deadline)
+    except CircuitOpenError as e:
+        status.update(f"⚠️ {e}")
+        return None
 
-            # Get file URL and download
-            file_url = file.get("url_private_download")
-            file_name = file.get("name", "document.pdf")
+    if not content:
+        status.update("❌ Couldn't extract text from that PDF. Make sure it's not a scanned image.")
+        return None
 
-            if file_url:
-                content = extract_from_pdf(file_url, slack_client)
+    source_id = record_source(status.channel, status.thread_ts, payload["name"], content)
+    return {
+        "content": content,
+        "source": payload["name"],
+        "source_id": source_id,
+        "reuse": find_reusable_drafts(content, source_id, status.channel)
+    }
 
-                if content:
-                    # Store content for later processing
-                    pending_key = f"{channel}:{thread_ts}"
-                    pending_content[pending_key] = {
-                        "content": content,
-                        "source": file_name,
-                        "channel": channel
-                    }
 
-                    # Ask for voice selection
-                    send_voice_selection_prompt(channel, thread_ts)
-                else:
-                    send_slack_message(
-                        channel,
-                        "❌ Couldn't extract text from that PDF. Make sure it's not a scanned image.",
-                        thread_ts
-                    )
+def start_job_recovery():
+    """
+    Resume jobs left unfinished by a restarted or killed worker
+    Called by the serving entry points (gunicorn.conf.py, socket_mode.py, __main__),
+    never on import, so scripts importing app don't take over production jobs
+    """
+    start_recovery(resume_job)
 
 
 if __name__ == "__main__":
+    start_job_recovery()
     port = int(os.environ.get("PORT", 3000))
     app.run(host="0.0.0.0", port=port)
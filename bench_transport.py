@@ -0,0 +1,183 @@
+"""
+Transport Benchmark
+Compares event ack latency of the HTTP endpoint and Socket Mode, both run locally.
+Socket Mode talks to a small WebSocket stand-in for Slack, so no tokens are needed.
+
+Usage: python bench_transport.py [iterations]
+"""
+
+import sys
+import json
+import time
+import uuid
+import base64
+import socket
+import struct
+import hashlib
+import threading
+import requests
+from werkzeug.serving import make_server
+
+from app import app
+from socket_mode import create_socket_mode_client
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def sample_event(event_id: str) -> dict:
+    """A bot message event: goes through dispatch but starts no work"""
+    return {
+        "type": "event_callback",
+        "event_id": event_id,
+        "event": {"type": "message", "bot_id": "B0BENCH", "channel": "C0BENCH", "text": "bench"},
+    }
+
+
+class SlackStandIn:
+    """Minimal WebSocket server that speaks enough of Socket Mode to send envelopes and read acks"""
+
+    def __init__(self):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(1)
+        self.url = f"ws://127.0.0.1:{self.server.getsockname()[1]}/link"
+        self.conn = None
+        self.connected = threading.Event()
+        self.acks = {}
+        self.ack_received = threading.Condition()
+
+    def start(self):
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        self.conn, _ = self.server.accept()
+        self.conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        # Opening handshake
+        request = b""
+        while b"\r\n\r\n" not in request:
+            request += self.conn.recv(4096)
+        key = [
+            line.split(b":", 1)[1].strip()
+            for line in request.split(b"\r\n")
+            if line.lower().startswith(b"sec-websocket-key:")
+        ][0]
+        accept = base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID.encode()).digest()).decode()
+        self.conn.sendall(
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode()
+        )
+
+        self.send({"type": "hello", "num_connections": 1})
+        self.connected.set()
+
+        while True:
+            try:
+                opcode, payload = self._read_frame()
+            except (ConnectionError, OSError):
+                return
+            if opcode == 0x1:
+                message = json.loads(payload)
+                with self.ack_received:
+                    self.acks[message.get("envelope_id")] = time.perf_counter()
+                    self.ack_received.notify_all()
+            elif opcode == 0x9:
+                self._write_frame(0xA, payload)
+            elif opcode == 0x8:
+                return
+
+    def _recv_exact(self, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = self.conn.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Client disconnected")
+            data += chunk
+        return data
+
+    def _read_frame(self):
+        first, second = self._recv_exact(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack(">H", self._recv_exact(2))[0]
+        elif length == 127:
+            length = struct.unpack(">Q", self._recv_exact(8))[0]
+        mask = self._recv_exact(4) if second & 0x80 else b"\x00\x00\x00\x00"
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(self._recv_exact(length)))
+        return first & 0x0F, payload
+
+    def _write_frame(self, opcode: int, payload: bytes):
+        header = bytes([0x80 | opcode])
+        if len(payload) < 126:
+            header += bytes([len(payload)])
+        elif len(payload) < 65536:
+            header += bytes([126]) + struct.pack(">H", len(payload))
+        else:
+            header += bytes([127]) + struct.pack(">Q", len(payload))
+        self.conn.sendall(header + payload)
+
+    def send(self, message: dict):
+        self._write_frame(0x1, json.dumps(message).encode())
+
+    def send_envelope(self, payload: dict, timeout: float = 5) -> float:
+        """Send an events_api envelope and return seconds until it was acked"""
+        envelope_id = str(uuid.uuid4())
+        start = time.perf_counter()
+        self.send({
+            "envelope_id": envelope_id,
+            "type": "events_api",
+            "accepts_response_payload": False,
+            "payload": payload,
+        })
+        with self.ack_received:
+            if not self.ack_received.wait_for(lambda: envelope_id in self.acks, timeout):
+                raise TimeoutError("Envelope was not acked")
+            return self.acks.pop(envelope_id) - start
+
+
+def bench_http(iterations: int) -> list:
+    """POST events to a local server; a new connection per request, as with Slack"""
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/slack/events"
+
+    timings = []
+    try:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            requests.post(url, json=sample_event(str(uuid.uuid4())), timeout=5).raise_for_status()
+            timings.append(time.perf_counter() - start)
+    finally:
+        server.shutdown()
+    return timings
+
+
+def bench_socket_mode(iterations: int) -> list:
+    """Send envelopes over one persistent WebSocket and time the acks"""
+    stand_in = SlackStandIn()
+    stand_in.start()
+
+    client = create_socket_mode_client(app_token="xapp-bench", wss_url=stand_in.url)
+    client.connect()
+    stand_in.connected.wait(5)
+
+    try:
+        return [stand_in.send_envelope(sample_event(str(uuid.uuid4()))) for _ in range(iterations)]
+    finally:
+        client.close()
+
+
+def summarize(name: str, timings: list):
+    timings = sorted(timings)
+    p50 = timings[len(timings) // 2] * 1000
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000
+    print(f"{name:<12} n={len(timings):<5} p50={p50:7.2f}ms  p95={p95:7.2f}ms")
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    summarize("http", bench_http(iterations))
+    summarize("socket_mode", bench_socket_mode(iterations))
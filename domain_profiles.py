@@ -0,0 +1,142 @@
+"""
+Domain Extraction Profiles
+Remembers which content selector works for each domain so later fetches skip the selector cascade
+"""
+
+import os
+import json
+import time
+import fcntl
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+PROFILES_PATH = os.environ.get("DOMAIN_PROFILES_PATH", "domain_profiles.json")
+
+# Default minimum length of a text fragment worth keeping
+DEFAULT_MIN_PARAGRAPH_LENGTH = 20
+
+# When only <body> matches, nav and link lists leak in, so keep longer fragments only
+BODY_MIN_PARAGRAPH_LENGTH = 40
+
+# Boilerplate commonly found inside article containers
+BOILERPLATE_SELECTORS = [
+    '.share',
+    '.social-share',
+    '.sharing',
+    '.related',
+    '.related-posts',
+    '.newsletter',
+    '.subscribe',
+    '.comments',
+    '#comments',
+    '.author-bio',
+    '.tags',
+    '.breadcrumbs',
+    '.cookie-banner',
+    '[aria-label="breadcrumb"]',
+]
+
+# Matches every page, so a profile for it would never stop matching and be re-learned
+FALLBACK_SELECTOR = 'body'
+
+_profiles = None
+_loaded_stamp = None
+_lock = threading.Lock()
+
+
+def _load():
+    """Load profiles from disk, again whenever another process has rewritten the file"""
+    global _profiles, _loaded_stamp
+    try:
+        stat = os.stat(PROFILES_PATH)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        stamp = None
+
+    if _profiles is not None and stamp == _loaded_stamp:
+        return
+
+    try:
+        with open(PROFILES_PATH) as f:
+            _profiles = json.load(f)
+    except FileNotFoundError:
+        _profiles = {}
+    except Exception as e:
+        logger.error(f"Error loading domain profiles: {e}")
+        _profiles = {}
+    _loaded_stamp = stamp
+
+
+@contextmanager
+def _file_lock():
+    """Serialize read-modify-write of the profiles file across processes (gunicorn, Socket Mode)"""
+    with open(f"{PROFILES_PATH}.lock", 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _save():
+    """Write profiles atomically so concurrent workers never read half a file"""
+    global _loaded_stamp
+    tmp_path = f"{PROFILES_PATH}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(_profiles, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, PROFILES_PATH)
+        stat = os.stat(PROFILES_PATH)
+        _loaded_stamp = (stat.st_mtime_ns, stat.st_size)
+    except Exception as e:
+        logger.error(f"Error saving domain profiles: {e}")
+
+
+def get_profile(domain: str) -> dict:
+    """Return the learned profile for a domain, or None"""
+    with _lock:
+        _load()
+        profile = _profiles.get(domain)
+        # Files written before fallback profiles were refused may still hold one
+        if not profile or profile.get("selector") == FALLBACK_SELECTOR:
+            return None
+        return dict(profile)
+
+
+def build_profile(selector: str, main_content) -> dict:
+    """Describe what worked for a page: winning selector, boilerplate present, fragment length"""
+    return {
+        "selector": selector,
+        "strip": [s for s in BOILERPLATE_SELECTORS if main_content.select_one(s)],
+        "min_paragraph_length": BODY_MIN_PARAGRAPH_LENGTH if selector == FALLBACK_SELECTOR else DEFAULT_MIN_PARAGRAPH_LENGTH,
+    }
+
+
+def save_profile(domain: str, profile: dict):
+    """
+    Persist a profile after a successful extraction (only written when it changes)
+    Fallback <body> profiles aren't kept, so the cascade keeps looking for a real container
+    """
+    if profile["selector"] == FALLBACK_SELECTOR:
+        forget_profile(domain)
+        return
+
+    with _lock, _file_lock():
+        _load()
+        existing = _profiles.get(domain, {})
+        if any(existing.get(key) != value for key, value in profile.items()):
+            _profiles[domain] = {**profile, "learned_at": int(time.time())}
+            _save()
+            logger.info(f"Learned extraction profile for {domain}: {profile['selector']}")
+
+
+def forget_profile(domain: str):
+    """Drop a profile that no longer matches the domain's pages"""
+    with _lock, _file_lock():
+        _load()
+        if _profiles.pop(domain, None) is not None:
+            _save()
+            logger.info(f"Dropped stale extraction profile for {domain}")
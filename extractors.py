@@ -5,15 +5,58 @@ Extract text content from URLs, PDF files, and YouTube videos
 
 import os
 import re
+import math
+import threading
 import requests
 import tempfile
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse, parse_qs
 import PyPDF2
+from resilience import get_breaker, web_breaker_name, call_timeout, CircuitOpenError
+from domain_profiles import get_profile, build_profile, save_profile, forget_profile
 
 logger = logging.getLogger(__name__)
 
+# Long documents are condensed before drafting, so read far past the first pages
+MAX_PDF_PAGES = int(os.environ.get("MAX_PDF_PAGES", 200))
+
+# Videos longer than this are split into segments analyzed in parallel (seconds)
+YOUTUBE_SEGMENT_THRESHOLD = int(os.environ.get("YOUTUBE_SEGMENT_THRESHOLD", 1200))
+YOUTUBE_SEGMENT_SECONDS = int(os.environ.get("YOUTUBE_SEGMENT_SECONDS", 600))
+YOUTUBE_SEGMENT_CONCURRENCY = int(os.environ.get("YOUTUBE_SEGMENT_CONCURRENCY", 4))
+YOUTUBE_MAX_SEGMENTS = 12
+
+# Share of the job's remaining time segments may use; the rest is kept for condensing and drafting
+YOUTUBE_SEGMENT_DEADLINE_SHARE = float(os.environ.get("YOUTUBE_SEGMENT_DEADLINE_SHARE", 0.5))
+
+GEMINI_MODEL = 'gemini-2.0-flash-001'
+
+# Longest a Gemini video analysis may take
+GEMINI_TIMEOUT_SECONDS = 300
+
+# Segment analyses by (video_id, start, end), so a retry only redoes failed segments
+_segment_cache = {}
+_segment_cache_lock = threading.Lock()
+SEGMENT_CACHE_SIZE = 500
+
+# Sections every segment analysis reports, merged across segments in this order
+SEGMENT_SECTIONS = ["Key Points", "Notable Quotes", "Takeaways"]
+
+SEGMENT_PROMPT = """Analyze this part of a YouTube video ({start} to {end}). Provide exactly these sections:
+
+## Key Points
+The main points, insights, or arguments made in this part (bullet points)
+
+## Notable Quotes
+Memorable or impactful statements, with approximate timestamps
+
+## Takeaways
+1-2 actionable insights or lessons from this part
+
+Please be thorough but concise. This analysis will be used to create LinkedIn posts about the video content."""
+
 # YouTube URL patterns
 YOUTUBE_PATTERNS = [
     r'(?:https?://)?(?:www\.)?youtube\.com/watch\?v=([a-zA-Z0-9_-]{11})',
@@ -49,11 +92,13 @@ def normalize_youtube_url(url: str) -> str:
     return url
 
 
-def extract_from_youtube(url: str) -> dict:
+def extract_from_youtube(url: str, deadline=None) -> dict:
     """
     Extract content from a YouTube video using Google Gemini API
     Returns a dict with 'content' and 'is_youtube' flag
     """
+    breaker = get_breaker("gemini")
+
     try:
         from google import genai
         from google.genai import types
@@ -69,12 +114,25 @@ def extract_from_youtube(url: str) -> dict:
 
         logger.info(f"Analyzing YouTube video: {normalized_url}")
 
-        # Initialize Gemini client
-        client = genai.Client(api_key=api_key)
+        # Initialize Gemini client (timeout in milliseconds)
+        timeout = call_timeout(deadline, GEMINI_TIMEOUT_SECONDS)
+        cut_short = timeout < GEMINI_TIMEOUT_SECONDS
+        client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(timeout=int(timeout * 1000))
+        )
+
+        # Long videos are analyzed in parallel segments
+        duration = get_youtube_duration(video_id, deadline)
+        if duration and duration > YOUTUBE_SEGMENT_THRESHOLD:
+            return _extract_youtube_segments(client, types, breaker, normalized_url, video_id, duration, deadline,
+                                             cut_short)
 
         # Analyze the video with Gemini
-        response = client.models.generate_content(
-            model='gemini-2.0-flash-001',
+        response = breaker.call(
+            client.models.generate_content,
+            cut_short=cut_short,
+            model=GEMINI_MODEL,
             contents=types.Content(
                 parts=[
                     types.Part(
@@ -108,6 +166,154 @@ Please be thorough but concise. This analysis will be used to create LinkedIn po
         logger.error(f"Error analyzing YouTube video {url}: {e}")
         return {"content": None, "is_youtube": True, "error": str(e)}
 
+
+def get_youtube_duration(video_id: str, deadline=None) -> int:
+    """Read a video's length in seconds from its watch page; None if unknown"""
+    url = f"https://www.youtube.com/watch?v={video_id}"
+    try:
+        timeout = call_timeout(deadline, 10)
+        response = get_breaker(web_breaker_name(url)).call(_fetch, url, HEADERS, timeout, cut_short=timeout < 10)
+        match = re.search(r'"lengthSeconds":"(\d+)"', response.text)
+        return int(match.group(1)) if match else None
+    except Exception as e:
+        logger.warning(f"Couldn't read duration of YouTube video {video_id}: {e}")
+        return None
+
+
+def _format_timestamp(seconds: int) -> str:
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+def _analyze_segment(client, types, breaker, url: str, video_id: str, start: int, end: int,
+                     cut_short: bool = False) -> str:
+    """Analyze one time segment of a video, reusing a cached result when there is one"""
+    key = (video_id, start, end)
+    with _segment_cache_lock:
+        if key in _segment_cache:
+            return _segment_cache[key]
+
+    response = breaker.call(
+        client.models.generate_content,
+        cut_short=cut_short,
+        model=GEMINI_MODEL,
+        contents=types.Content(
+            parts=[
+                types.Part(
+                    file_data=types.FileData(file_uri=url),
+                    video_metadata=types.VideoMetadata(start_offset=f"{start}s", end_offset=f"{end}s")
+                ),
+                types.Part(text=SEGMENT_PROMPT.format(start=_format_timestamp(start), end=_format_timestamp(end)))
+            ]
+        )
+    )
+
+    analysis = response.text
+    if not analysis:
+        raise ValueError("No content extracted from segment")
+
+    with _segment_cache_lock:
+        _segment_cache[key] = analysis
+        if len(_segment_cache) > SEGMENT_CACHE_SIZE:
+            for old_key in list(_segment_cache)[:SEGMENT_CACHE_SIZE // 2]:
+                del _segment_cache[old_key]
+
+    return analysis
+
+
+def _split_sections(analysis: str) -> dict:
+    """Split a segment analysis into its Key Points / Notable Quotes / Takeaways sections"""
+    sections = {}
+    current = None
+    for line in analysis.splitlines():
+        # Only markdown headings and fully bold lines can start a section, not bullets mentioning one
+        stripped = line.strip().rstrip(':')
+        match = None
+        if stripped.startswith('#') or (len(stripped) > 4 and stripped.startswith('**') and stripped.endswith('**')):
+            heading = stripped.strip('#*: ').lower()
+            match = next((name for name in SEGMENT_SECTIONS if heading.endswith(name.lower())), None)
+            if match and len(heading) > len(match) + 10:
+                match = None
+
+        if match:
+            # A repeated heading continues its section
+            current = match
+            sections.setdefault(current, [])
+        elif current:
+            sections[current].append(line)
+    return {name: '\n'.join(lines).strip() for name, lines in sections.items()}
+
+
+def _merge_segments(results: list, failed: list) -> str:
+    """Merge per-segment analyses into one analysis grouped by section"""
+    parsed = [(label, _split_sections(analysis)) for label, analysis in results]
+
+    parts = []
+    for name in SEGMENT_SECTIONS:
+        entries = [f"### {label}\n{sections[name]}" for label, sections in parsed if sections.get(name)]
+        if entries:
+            parts.append(f"## {name}\n\n" + '\n\n'.join(entries))
+
+    # Segments whose output didn't follow the structure are kept as-is
+    unstructured = [f"### {label}\n{analysis}" for (label, analysis), (_, sections) in zip(results, parsed) if not sections]
+    if unstructured:
+        parts.append("## Other Notes\n\n" + '\n\n'.join(unstructured))
+
+    if failed:
+        parts.append(f"_Segments not analyzed: {', '.join(failed)}_")
+
+    return '\n\n'.join(parts)
+
+
+def _extract_youtube_segments(client, types, breaker, url: str, video_id: str, duration: int, deadline=None,
+                              cut_short: bool = False) -> dict:
+    """
+    Analyze a long video as time segments in parallel and merge the results
+    Segments that fail or miss their share of the deadline are skipped; the rest are kept
+    """
+    segment_seconds = max(YOUTUBE_SEGMENT_SECONDS, math.ceil(duration / YOUTUBE_MAX_SEGMENTS))
+    segments = [(start, min(start + segment_seconds, duration)) for start in range(0, duration, segment_seconds)]
+
+    logger.info(f"Analyzing YouTube video {video_id} ({duration}s) in {len(segments)} segments")
+
+    executor = ThreadPoolExecutor(max_workers=YOUTUBE_SEGMENT_CONCURRENCY)
+    futures = [
+        executor.submit(_analyze_segment, client, types, breaker, url, video_id, start, end, cut_short)
+        for start, end in segments
+    ]
+    budget = deadline.remaining() * YOUTUBE_SEGMENT_DEADLINE_SHARE if deadline else None
+    done, not_done = wait(futures, timeout=budget)
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    results = []
+    failed = []
+    for (start, end), future in zip(segments, futures):
+        label = f"{_format_timestamp(start)}–{_format_timestamp(end)}"
+        try:
+            if future not in done:
+                raise TimeoutError("Deadline exceeded")
+            results.append((label, future.result()))
+        except Exception as e:
+            logger.error(f"Error analyzing segment {label} of YouTube video {video_id}: {e}")
+            failed.append(label)
+
+    if not results:
+        return {"content": None, "is_youtube": True, "error": "No content extracted from video"}
+
+    content = _merge_segments(results, failed)
+    content = f"# YouTube Video Analysis\n\nVideo URL: {url}\n\n{content}"
+    logger.info(f"Analyzed {len(results)}/{len(segments)} segments of YouTube video: {video_id}")
+    return {"content": content, "is_youtube": True, "video_id": video_id}
+
+
+def _fetch(url: str, headers: dict, timeout: float):
+    """GET a URL and raise on HTTP errors"""
+    response = requests.get(url, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    return response
+
+
 # Headers to mimic browser request
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -116,14 +322,67 @@ HEADERS = {
 }
 
 
-def extract_from_url(url: str) -> str:
+# Common article/content selectors, tried in order when a domain has no profile
+CONTENT_SELECTORS = [
+    'article',
+    '[role="main"]',
+    '.post-content',
+    '.article-content',
+    '.entry-content',
+    '.content',
+    'main',
+    '.blog-post',
+    '.post-body',
+]
+
+
+def _find_main_content(soup):
+    """Run the selector cascade; returns (selector, node), falling back to body"""
+    for selector in CONTENT_SELECTORS:
+        main_content = soup.select_one(selector)
+        if main_content:
+            return selector, main_content
+    return 'body', soup.body
+
+
+def _extract_text(main_content, title: str, strip: list, min_length: int) -> str:
+    """Pull text fragments out of the content node; None if too little is left"""
+    for selector in strip:
+        for element in main_content.select(selector):
+            element.decompose()
+
+    paragraphs = main_content.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'li'])
+    text_parts = []
+    
+    for p in paragraphs:
+        text = p.get_text().strip()
+        if text and len(text) > min_length:  # Filter out very short fragments
+            text_parts.append(text)
+    
+    content = '\n\n'.join(text_parts)
+    
+    # Add title at the beginning
+    if title:
+        content = f"# {title}\n\n{content}"
+    
+    # Basic cleanup
+    content = ' '.join(content.split())  # Normalize whitespace
+    
+    return content if len(content) > 100 else None
+
+
+def extract_from_url(url: str, deadline=None) -> str:
     """
     Extract main content from a URL
+    Uses the domain's learned profile when there is one, otherwise the selector cascade
     Returns the text content or None if extraction fails
     """
+    breaker = get_breaker(web_breaker_name(url))
+    domain = urlparse(url).netloc.lower()
+
     try:
-        response = requests.get(url, headers=HEADERS, timeout=15)
-        response.raise_for_status()
+        timeout = call_timeout(deadline, 15)
+        response = breaker.call(_fetch, url, HEADERS, timeout, cut_short=timeout < 15)
         
         soup = BeautifulSoup(response.content, 'html.parser')
         
@@ -131,34 +390,6 @@ def extract_from_url(url: str) -> str:
         for element in soup.find_all(['script', 'style', 'nav', 'footer', 'header', 'aside', 'form', 'iframe']):
             element.decompose()
         
-        # Try to find the main content area
-        main_content = None
-        
-        # Common article/content selectors
-        content_selectors = [
-            'article',
-            '[role="main"]',
-            '.post-content',
-            '.article-content',
-            '.entry-content',
-            '.content',
-            'main',
-            '.blog-post',
-            '.post-body',
-        ]
-        
-        for selector in content_selectors:
-            main_content = soup.select_one(selector)
-            if main_content:
-                break
-        
-        # Fallback to body
-        if not main_content:
-            main_content = soup.body
-        
-        if not main_content:
-            return None
-        
         # Get title
         title = ""
         title_tag = soup.find('title')
@@ -169,27 +400,34 @@ def extract_from_url(url: str) -> str:
         if h1_tag:
             title = h1_tag.get_text().strip()
         
-        # Extract text
-        paragraphs = main_content.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'li'])
-        text_parts = []
-        
-        for p in paragraphs:
-            text = p.get_text().strip()
-            if text and len(text) > 20:  # Filter out very short fragments
-                text_parts.append(text)
-        
-        content = '\n\n'.join(text_parts)
-        
-        # Add title at the beginning
-        if title:
-            content = f"# {title}\n\n{content}"
-        
-        # Basic cleanup
-        content = ' '.join(content.split())  # Normalize whitespace
-        
-        logger.info(f"Extracted {len(content)} characters from {url}")
+        content = None
+
+        # Go straight to the node that worked for this domain before
+        profile = get_profile(domain)
+        if profile:
+            main_content = soup.select_one(profile["selector"])
+            if main_content:
+                content = _extract_text(main_content, title, profile["strip"], profile["min_paragraph_length"])
+            if not content:
+                logger.info(f"Extraction profile for {domain} stopped matching, running full cascade")
+
+        if not content:
+            selector, main_content = _find_main_content(soup)
+            if not main_content:
+                return None
+
+            profile = build_profile(selector, main_content)
+            content = _extract_text(main_content, title, profile["strip"], profile["min_paragraph_length"])
+
+            if content:
+                save_profile(domain, profile)
+            else:
+                forget_profile(domain)
+
+        if content:
+            logger.info(f"Extracted {len(content)} characters from {url}")
         
-        return content if len(content) > 100 else None
+        return content
         
     except requests.RequestException as e:
         logger.error(f"Error fetching URL {url}: {e}")
@@ -199,10 +437,11 @@ def extract_from_url(url: str) -> str:
         return None
 
 
-def extract_from_pdf(file_url: str, slack_client) -> str:
+def extract_from_pdf(file_url: str, slack_client, deadline=None) -> str:
     """
     Extract text from a PDF file shared in Slack
     Downloads the file using Slack auth and extracts text
+    Raises CircuitOpenError if Slack is known to be down, so the caller can say so
     """
     try:
         # Download file from Slack (requires auth)
@@ -210,8 +449,8 @@ def extract_from_pdf(file_url: str, slack_client) -> str:
             'Authorization': f'Bearer {slack_client.token}'
         }
         
-        response = requests.get(file_url, headers=headers, timeout=30)
-        response.raise_for_status()
+        timeout = call_timeout(deadline, 30)
+        response = get_breaker("slack").call(_fetch, file_url, headers, timeout, cut_short=timeout < 30)
         
         # Save to temp file
         with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp_file:
@@ -230,9 +469,9 @@ def extract_from_pdf(file_url: str, slack_client) -> str:
                     if page_text:
                         text_parts.append(page_text)
                     
-                    # Limit to first 20 pages
-                    if page_num >= 19:
-                        text_parts.append("\n[Content truncated - PDF exceeds 20 pages]")
+                    # Limit to first MAX_PDF_PAGES pages
+                    if page_num >= MAX_PDF_PAGES - 1:
+                        text_parts.append(f"\n[Content truncated - PDF exceeds {MAX_PDF_PAGES} pages]")
                         break
             
             content = '\n\n'.join(text_parts)
@@ -248,6 +487,8 @@ def extract_from_pdf(file_url: str, slack_client) -> str:
             # Clean up temp file
             os.unlink(tmp_path)
             
+    except CircuitOpenError:
+        raise
     except requests.RequestException as e:
         logger.error(f"Error downloading PDF: {e}")
         return None
@@ -0,0 +1,128 @@
+"""
+Content Fingerprints
+MinHash signatures and an LSH index to spot near-duplicate sources (syndicated articles, URL vs PDF)
+"""
+
+import os
+import re
+import random
+import hashlib
+import logging
+import threading
+from array import array
+from history import record_fingerprint, load_fingerprints
+
+logger = logging.getLogger(__name__)
+
+# Minimum estimated Jaccard similarity to count as the same source
+SIMILARITY_THRESHOLD = float(os.environ.get("DUPLICATE_SIMILARITY", 0.8))
+
+# Signature layout: BANDS x ROWS hashes; a pair is a candidate if any band matches
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Words per shingle, and a cap so huge documents stay quick to fingerprint
+SHINGLE_SIZE = 5
+MAX_SHINGLES = 20000
+
+_MASK = (1 << 64) - 1
+
+# Fixed seed so signatures stay comparable across restarts and workers
+_rng = random.Random(1729)
+_PERMUTATIONS = [(_rng.getrandbits(64) | 1, _rng.getrandbits(64)) for _ in range(NUM_PERM)]
+
+
+def _shingle_hashes(text: str) -> set:
+    """64-bit hashes of overlapping word n-grams"""
+    words = re.findall(r'\w+', text.lower())
+    if len(words) < SHINGLE_SIZE:
+        words = words + [''] * (SHINGLE_SIZE - len(words))
+
+    hashes = set()
+    for i in range(min(len(words) - SHINGLE_SIZE + 1, MAX_SHINGLES)):
+        shingle = ' '.join(words[i:i + SHINGLE_SIZE]).encode()
+        hashes.add(int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), 'little'))
+    return hashes
+
+
+def minhash_signature(text: str) -> array:
+    """MinHash signature of a text, using affine permutations of the 64-bit shingle hashes"""
+    hashes = list(_shingle_hashes(text))
+    return array('Q', [min([(a * h + b) & _MASK for h in hashes]) for a, b in _PERMUTATIONS])
+
+
+def similarity(first: array, second: array) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(first, second) if x == y) / NUM_PERM
+
+
+def _band_keys(signature: array) -> list:
+    return [(band, tuple(signature[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+
+class LSHIndex:
+    """In-memory banded LSH index: lookups touch BANDS dict entries, not every source"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._signatures = {}
+        self._lock = threading.Lock()
+
+    def add(self, source_id: int, signature: array):
+        with self._lock:
+            self._signatures[source_id] = signature
+            for key in _band_keys(signature):
+                self._buckets.setdefault(key, set()).add(source_id)
+
+    def query(self, signature: array, threshold: float = SIMILARITY_THRESHOLD) -> list:
+        """Return [(source_id, similarity)] above the threshold, most similar first"""
+        with self._lock:
+            candidates = set()
+            for key in _band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+
+            matches = [(source_id, similarity(signature, self._signatures[source_id])) for source_id in candidates]
+
+        return sorted([m for m in matches if m[1] >= threshold], key=lambda m: -m[1])
+
+    def __len__(self):
+        return len(self._signatures)
+
+
+_index = None
+_loaded_up_to = 0
+_index_lock = threading.Lock()
+
+
+def _get_index() -> LSHIndex:
+    """
+    Return the index, first adding fingerprints stored since the last call
+    Other gunicorn workers and the Socket Mode process write to the same database,
+    so each lookup picks up their new sources (one indexed query)
+    """
+    global _index, _loaded_up_to
+    with _index_lock:
+        if _index is None:
+            _index = LSHIndex()
+
+        rows = load_fingerprints(_loaded_up_to)
+        for source_id, data in rows:
+            signature = array('Q')
+            signature.frombytes(data)
+            _index.add(source_id, signature)
+        if rows:
+            _loaded_up_to = rows[-1][0]
+            logger.info(f"Loaded {len(rows)} new source fingerprints ({len(_index)} total)")
+        return _index
+
+
+def find_near_duplicates(signature: array) -> list:
+    """Return [(source_id, similarity)] of previously seen sources like this one"""
+    return _get_index().query(signature)
+
+
+def add_fingerprint(source_id: int, signature: array):
+    """Index and persist a source's signature"""
+    _get_index().add(source_id, signature)
+    record_fingerprint(source_id, signature.tobytes())
@@ -0,0 +1,10 @@
+"""
+Gunicorn Settings
+Starts job recovery in each worker once the app is loaded
+"""
+
+
+def post_worker_init(worker):
+    """Resume jobs left unfinished by a previous or crashed worker"""
+    from app import start_job_recovery
+    start_job_recovery()
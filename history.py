@@ -0,0 +1,269 @@
+"""
+Draft History
+Local SQLite store of extracted sources and generated drafts, searchable with FTS5
+"""
+
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DB_PATH = os.environ.get("HISTORY_DB_PATH", "history.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    created_at INTEGER NOT NULL,
+    channel TEXT,
+    thread_ts TEXT,
+    source TEXT,
+    content TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS drafts (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER REFERENCES sources(id),
+    created_at INTEGER NOT NULL,
+    channel TEXT,
+    thread_ts TEXT,
+    voice TEXT,
+    drafts TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS fingerprints (
+    source_id INTEGER PRIMARY KEY REFERENCES sources(id),
+    signature BLOB NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS drafts_channel ON drafts(channel);
+CREATE INDEX IF NOT EXISTS drafts_thread ON drafts(channel, thread_ts);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS sources_fts USING fts5(
+    source, content, content='sources', content_rowid='id', tokenize='porter unicode61'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS drafts_fts USING fts5(
+    drafts, content='drafts', content_rowid='id', tokenize='porter unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS sources_ai AFTER INSERT ON sources BEGIN
+    INSERT INTO sources_fts(rowid, source, content) VALUES (new.id, new.source, new.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS drafts_ai AFTER INSERT ON drafts BEGIN
+    INSERT INTO drafts_fts(rowid, drafts) VALUES (new.id, new.drafts);
+END;
+"""
+
+# Matching drafts made in one channel, ranked by the better of the draft match and the source match
+SEARCH_SQL = """
+SELECT id, source, voice, drafts, created_at, MIN(score) AS score FROM (
+    SELECT d.id, s.source, d.voice, d.drafts, d.created_at, bm25(drafts_fts) AS score
+    FROM drafts_fts
+    JOIN drafts d ON d.id = drafts_fts.rowid
+    LEFT JOIN sources s ON s.id = d.source_id
+    WHERE drafts_fts MATCH :query AND d.channel = :channel
+    UNION ALL
+    SELECT d.id, s.source, d.voice, d.drafts, d.created_at, bm25(sources_fts) AS score
+    FROM sources_fts
+    JOIN sources s ON s.id = sources_fts.rowid
+    JOIN drafts d ON d.source_id = s.id
+    WHERE sources_fts MATCH :query AND d.channel = :channel
+)
+GROUP BY id
+ORDER BY score
+LIMIT :limit
+"""
+
+_initialized = False
+_init_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    """Open a connection, creating the schema on first use"""
+    global _initialized
+    conn = sqlite3.connect(HISTORY_DB_PATH, timeout=10)
+    conn.row_factory = sqlite3.Row
+
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                # WAL lets gunicorn workers read while another one writes
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                _initialized = True
+
+    return conn
+
+
+def record_source(channel: str, thread_ts: str, source: str, content: str) -> int:
+    """Store extracted content; returns its id, or None if the store is unavailable"""
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO sources (created_at, channel, thread_ts, source, content) VALUES (?, ?, ?, ?, ?)",
+                    (int(time.time()), channel, thread_ts, source, content)
+                )
+            return cursor.lastrowid
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Error recording source: {e}")
+        return None
+
+
+def record_drafts(source_id: int, channel: str, thread_ts: str, voice: str, drafts: str) -> int:
+    """Store generated drafts; returns their id, or None if the store is unavailable"""
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO drafts (source_id, created_at, channel, thread_ts, voice, drafts) VALUES (?, ?, ?, ?, ?, ?)",
+                    (source_id, int(time.time()), channel, thread_ts, voice, drafts)
+                )
+            return cursor.lastrowid
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Error recording drafts: {e}")
+        return None
+
+
+def record_fingerprint(source_id: int, signature: bytes):
+    """Store a source's MinHash signature"""
+    if source_id is None:
+        return
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO fingerprints (source_id, signature) VALUES (?, ?)",
+                    (source_id, signature)
+                )
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Error recording fingerprint: {e}")
+
+
+def load_fingerprints(after_id: int = 0) -> list:
+    """Return [(source_id, signature)] for fingerprinted sources with ids above after_id, in id order"""
+    try:
+        conn = _connect()
+        try:
+            rows = conn.execute(
+                "SELECT source_id, signature FROM fingerprints WHERE source_id > ? ORDER BY source_id",
+                (after_id,)
+            )
+            return [tuple(row) for row in rows]
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Error loading fingerprints: {e}")
+        return []
+
+
+def _fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching all words (no FTS syntax errors)"""
+    words = re.findall(r'\w+', text.lower())
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def search_drafts(text: str, channel: str, limit: int = 5) -> list:
+    """
+    Search past drafts made in a channel by draft text and by the text of their source
+    Scoped to one channel so DMs and private channels never show up elsewhere
+    """
+    query = _fts_query(text)
+    if not query or not channel:
+        return []
+
+    try:
+        conn = _connect()
+        try:
+            rows = conn.execute(SEARCH_SQL, {"query": query, "channel": channel, "limit": limit}).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Error searching history: {e}")
+        return []
+
+
+def get_latest_drafts(source_ids: list, channel: str) -> dict:
+    """
+    Return the most recent drafts made in a channel from any of the given sources
+    (first id preferred), or None
+    """
+    if not source_ids:
+        return None
+
+    try:
+        conn = _connect()
+        try:
+            for source_id in source_ids:
+                row = conn.execute(
+                    """SELECT d.id, d.source_id, s.source, d.voice, d.drafts, d.created_at
+                    FROM drafts d JOIN sources s ON s.id = d.source_id
+                    WHERE d.source_id = ? AND s.channel = ? AND d.channel = ?
+                    ORDER BY d.id DESC LIMIT 1""",
+                    (source_id, channel, channel)
+                ).fetchone()
+                if row:
+                    return dict(row)
+            return None
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Error loading drafts for sources {source_ids}: {e}")
+        return None
+
+
+def get_thread_drafts(channel: str, thread_ts: str) -> dict:
+    """Return the latest drafts made in a thread, with their source text (None if it's gone), or None"""
+    if not channel or not thread_ts:
+        return None
+
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute(
+                """SELECT d.id, d.source_id, s.source, s.content, d.voice, d.drafts, d.created_at
+                FROM drafts d LEFT JOIN sources s ON s.id = d.source_id
+                WHERE d.channel = ? AND d.thread_ts = ?
+                ORDER BY d.id DESC LIMIT 1""",
+                (channel, thread_ts)
+            ).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Error loading drafts for thread {channel}:{thread_ts}: {e}")
+        return None
+
+
+def get_drafts(draft_id: int, channel: str) -> dict:
+    """Return one set of past drafts made in a channel, with its source, or None"""
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute(
+                """SELECT d.id, s.source, d.voice, d.drafts, d.created_at
+                FROM drafts d LEFT JOIN sources s ON s.id = d.source_id
+                WHERE d.id = ? AND d.channel = ?""",
+                (draft_id, channel)
+            ).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Error loading drafts {draft_id}: {e}")
+        return None
@@ -0,0 +1,334 @@
+"""
+Job Journal
+Write-ahead SQLite record of each job's stage and intermediate results, so work survives worker restarts
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_DB_PATH = os.environ.get("JOB_JOURNAL_PATH", "jobs.db")
+
+# A worker that hasn't checked in for this long is treated as gone and its jobs are resumed
+LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", 30))
+
+# Runs (first try plus resumes) before a job is given up on
+MAX_JOB_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+
+# Finished, failed and abandoned jobs are deleted after this long
+RETENTION_SECONDS = float(os.environ.get("JOB_RETENTION_DAYS", 7)) * 86400
+
+# Job stages, in order
+STAGE_QUEUED = "queued"
+STAGE_EXTRACTING = "extracting"
+STAGE_CONDENSING = "condensing"
+STAGE_AWAITING_VOICE = "awaiting_voice"
+STAGE_GENERATING = "generating"
+STAGE_DONE = "done"
+STAGE_FAILED = "failed"
+
+# Stages where a worker is busy with the job (awaiting_voice is waiting on the user)
+ACTIVE_STAGES = (STAGE_QUEUED, STAGE_EXTRACTING, STAGE_CONDENSING, STAGE_GENERATING)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    channel TEXT,
+    user TEXT,
+    thread_ts TEXT,
+    status_ts TEXT,
+    stage TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT '{}',
+    owner TEXT,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    error TEXT,
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS jobs_stage ON jobs(stage);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(channel, status_ts);
+
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    pid INTEGER,
+    heartbeat_at REAL NOT NULL
+);
+"""
+
+_initialized = False
+_init_lock = threading.Lock()
+
+# Worker identity and recovery thread, per process (gunicorn forks after import)
+_worker = {"pid": None, "id": None, "thread": None, "resume": None}
+_worker_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    """Open a connection, creating the schema on first use"""
+    global _initialized
+    conn = sqlite3.connect(JOURNAL_DB_PATH, timeout=10)
+    conn.row_factory = sqlite3.Row
+
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                _initialized = True
+
+    return conn
+
+
+def _worker_id() -> str:
+    """Id of this process in the journal"""
+    with _worker_lock:
+        if _worker["pid"] != os.getpid():
+            _worker.update(pid=os.getpid(), id=uuid.uuid4().hex[:12], thread=None)
+        return _worker["id"]
+
+
+def _row_to_job(row) -> dict:
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    job["state"] = json.loads(job["state"])
+    return job
+
+
+def start_job(kind: str, channel: str, user: str, thread_ts: str, payload: dict) -> dict:
+    """Record a new job; its id is None if the journal is unavailable (the job still runs)"""
+    job = {
+        "id": None,
+        "kind": kind,
+        "channel": channel,
+        "user": user,
+        "thread_ts": thread_ts,
+        "status_ts": None,
+        "stage": STAGE_QUEUED,
+        "payload": payload,
+        "state": {},
+        "attempts": 1,
+    }
+
+    try:
+        conn = _connect()
+        try:
+            now = int(time.time())
+            with conn:
+                cursor = conn.execute(
+                    """INSERT INTO jobs (kind, channel, user, thread_ts, stage, payload, owner, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (kind, channel, user, thread_ts, STAGE_QUEUED, json.dumps(payload), _worker_id(), now, now)
+                )
+            job["id"] = cursor.lastrowid
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Error journaling {kind} job: {e}")
+
+    return job
+
+
+def record_status_ts(job_id: int, status_ts: str):
+    """Remember the job's status message so a resumed job edits it instead of posting again"""
+    if job_id is None:
+        return
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute("UPDATE jobs SET status_ts = ? WHERE id = ?", (status_ts, job_id))
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Error journaling status message of job {job_id}: {e}")
+
+
+def advance_job(job_id: int, stage: str, expect: str = None, **state) -> bool:
+    """
+    Move a job to a stage, merging state into its intermediate results
+    With expect, only moves a job currently at that stage; returns False if it wasn't
+    """
+    if job_id is None:
+        return True
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT stage, state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row is None or (expect and row["stage"] != expect):
+                    return False
+
+                merged = {**json.loads(row["state"]), **state}
+                conn.execute(
+                    "UPDATE jobs SET stage = ?, state = ?, owner = ?, updated_at = ? WHERE id = ?",
+                    (stage, json.dumps(merged), _worker_id(), int(time.time()), job_id)
+                )
+            return True
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Error journaling job {job_id} stage {stage}: {e}")
+        return True
+
+
+def fail_job(job_id: int, error: str):
+    """Mark a job as failed"""
+    if job_id is None:
+        return
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    "UPDATE jobs SET stage = ?, error = ?, updated_at = ? WHERE id = ?",
+                    (STAGE_FAILED, error, int(time.time()), job_id)
+                )
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Error journaling failure of job {job_id}: {e}")
+
+
+def settle_job(job_id: int):
+    """Mark a job failed if its handler returned while it was still mid-stage (it reported its own error)"""
+    if job_id is None:
+        return
+    placeholders = ", ".join("?" * len(ACTIVE_STAGES))
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    f"UPDATE jobs SET stage = ?, updated_at = ? WHERE id = ? AND stage IN ({placeholders})",
+                    (STAGE_FAILED, int(time.time()), job_id, *ACTIVE_STAGES)
+                )
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Error settling job {job_id}: {e}")
+
+
+def find_job(channel: str, status_ts: str) -> dict:
+    """Return the job behind a status message, or None"""
+    if not status_ts:
+        return None
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE channel = ? AND status_ts = ? ORDER BY id DESC LIMIT 1",
+                (channel, status_ts)
+            ).fetchone()
+            return _row_to_job(row) if row else None
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Error loading job for {channel}:{status_ts}: {e}")
+        return None
+
+
+def _claim_orphaned_jobs(conn: sqlite3.Connection) -> list:
+    """Take over active jobs whose worker stopped checking in"""
+    placeholders = ", ".join("?" * len(ACTIVE_STAGES))
+    rows = conn.execute(
+        f"""SELECT j.* FROM jobs j LEFT JOIN workers w ON w.id = j.owner
+        WHERE j.stage IN ({placeholders}) AND (w.id IS NULL OR w.heartbeat_at < ?) AND j.updated_at < ?
+        ORDER BY j.id""",
+        (*ACTIVE_STAGES, time.time() - LEASE_SECONDS, int(time.time() - LEASE_SECONDS))
+    ).fetchall()
+
+    claimed = []
+    for row in rows:
+        # Only one worker wins each job: the owner must still be the one we saw
+        with conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET owner = ?, attempts = attempts + 1, updated_at = ? WHERE id = ? AND owner IS ?",
+                (_worker_id(), int(time.time()), row["id"], row["owner"])
+            )
+        if cursor.rowcount:
+            job = _row_to_job(row)
+            job["attempts"] += 1
+            claimed.append(job)
+    return claimed
+
+
+def _recover():
+    """Check in, prune old jobs and hand orphaned jobs to the resume callback"""
+    conn = _connect()
+    try:
+        now = time.time()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO workers (id, pid, heartbeat_at) VALUES (?, ?, ?)",
+                (_worker_id(), os.getpid(), now)
+            )
+            conn.execute("DELETE FROM workers WHERE heartbeat_at < ?", (now - RETENTION_SECONDS,))
+            conn.execute(
+                "DELETE FROM jobs WHERE stage IN (?, ?, ?) AND updated_at < ?",
+                (STAGE_DONE, STAGE_FAILED, STAGE_AWAITING_VOICE, int(now - RETENTION_SECONDS))
+            )
+        jobs = _claim_orphaned_jobs(conn)
+    finally:
+        conn.close()
+
+    for job in jobs:
+        logger.info(f"Resuming {job['kind']} job {job['id']} at stage {job['stage']} (attempt {job['attempts']})")
+        try:
+            _worker["resume"](job)
+        except Exception as e:
+            logger.error(f"Error resuming job {job['id']}: {e}")
+
+
+def _recovery_loop():
+    while True:
+        try:
+            _recover()
+        except sqlite3.Error as e:
+            logger.error(f"Job journal recovery error: {e}")
+        time.sleep(LEASE_SECONDS / 3)
+
+
+def start_recovery(resume):
+    """
+    Start this process's heartbeat and recovery thread (once per process)
+    resume(job) is called for every active job left behind by a stopped worker,
+    including this process's own previous incarnation after a restart
+    """
+    _worker_id()
+    with _worker_lock:
+        _worker["resume"] = resume
+        if _worker["thread"] is None:
+            _worker["thread"] = threading.Thread(target=_recovery_loop, name="job-journal", daemon=True)
+            _worker["thread"].start()
+
+
+def job_counts() -> dict:
+    """Jobs per stage, with the age of the oldest job in each active stage"""
+    try:
+        conn = _connect()
+        try:
+            rows = conn.execute(
+                "SELECT stage, COUNT(*) AS jobs, MIN(updated_at) AS oldest FROM jobs GROUP BY stage"
+            ).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Error counting jobs: {e}")
+        return {}
+
+    now = int(time.time())
+    counts = {}
+    for row in rows:
+        counts[row["stage"]] = {"jobs": row["jobs"]}
+        if row["stage"] in ACTIVE_STAGES:
+            counts[row["stage"]]["oldest_seconds"] = now - row["oldest"]
+    return counts
@@ -0,0 +1,73 @@
+"""
+Job Status Messages
+One Slack message per job, posted once and then updated in place
+"""
+
+import logging
+import threading
+from slack_sdk.errors import SlackApiError
+from resilience import get_breaker, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatusMessage:
+    """
+    A single thread reply that tracks a job from start to finish
+    The first update posts the message; later updates (progress, voice
+    buttons, final drafts) edit it with chat_update
+    on_post(ts) is called once the message exists, so it can be found again
+    """
+
+    def __init__(self, slack_client, channel: str, thread_ts: str = None, ts: str = None, on_post=None):
+        self.slack_client = slack_client
+        self.channel = channel
+        self.thread_ts = thread_ts
+        self.ts = ts
+        self.on_post = on_post
+        # Number of updates so far, so late notices can avoid overwriting newer progress
+        self.revision = 0
+        self._lock = threading.Lock()
+
+    def update(self, text: str, blocks: list = None, unless_updated_since: int = None) -> bool:
+        """
+        Show text (and optional blocks) in the job's message
+        Blocks from a previous update are cleared unless new ones are given
+        With unless_updated_since, the update is skipped if the revision has moved on
+        Returns True if Slack accepted the update
+        """
+        breaker = get_breaker("slack")
+
+        with self._lock:
+            if unless_updated_since is not None and self.revision != unless_updated_since:
+                return False
+            self.revision += 1
+
+            try:
+                if self.ts is None:
+                    response = breaker.call(
+                        self.slack_client.chat_postMessage,
+                        channel=self.channel,
+                        text=text,
+                        thread_ts=self.thread_ts,
+                        blocks=blocks
+                    )
+                    self.ts = response["ts"]
+                    if self.on_post:
+                        self.on_post(self.ts)
+                else:
+                    breaker.call(
+                        self.slack_client.chat_update,
+                        channel=self.channel,
+                        ts=self.ts,
+                        text=text,
+                        blocks=blocks or []
+                    )
+                return True
+            except SlackApiError as e:
+                logger.error(f"Slack API error: {e}")
+            except CircuitOpenError as e:
+                logger.error(f"Skipped Slack update: {e}")
+            except Exception as e:
+                logger.error(f"Error updating Slack message: {e}")
+            return False
@@ -0,0 +1,293 @@
+"""
+Claude Request Helpers
+Optional hedged requests to cut tail latency, and prompt caching for conversation prefixes
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from resilience import get_breaker, call_timeout
+
+logger = logging.getLogger(__name__)
+
+# Hedging policy
+HEDGE_ENABLED = os.environ.get("HEDGE_ENABLED", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", 95))
+HEDGE_MODEL = os.environ.get("HEDGE_MODEL")  # Defaults to the primary model
+HEDGE_MIN_DELAY = float(os.environ.get("HEDGE_MIN_DELAY", 2.0))
+HEDGE_DEFAULT_DELAY = float(os.environ.get("HEDGE_DEFAULT_DELAY", 8.0))
+
+# Longest a single Claude request may take
+REQUEST_TIMEOUT_SECONDS = 120
+
+# Samples needed before the percentile replaces the default delay
+HEDGE_MIN_SAMPLES = 20
+
+# Recent time-to-first-output samples (seconds)
+_first_output_latencies = deque(maxlen=200)
+_lock = threading.Lock()
+
+hedge_stats = {
+    "requests": 0,
+    "hedges_fired": 0,
+    "hedges_won": 0,
+    "extra_tokens": 0,
+}
+
+
+class _Attempt:
+    """One streaming request racing in a hedge"""
+
+    def __init__(self, label: str, model: str):
+        self.label = label
+        self.model = model
+        self.parts = []
+        self.input_tokens = 0
+        # Same prompt as the winner, for a loser cancelled before its usage arrived
+        self.input_estimate = 0
+        self.output_tokens = 0
+        self.error = None
+        self.started_at = time.monotonic()
+        self.first_output = threading.Event()
+        self.cancelled = threading.Event()
+        self.stream = None
+        self.done = False
+        self._lock = threading.Lock()
+
+    @property
+    def text(self) -> str:
+        return ''.join(self.parts)
+
+    @property
+    def tokens(self) -> int:
+        # Cancelled streams never see the final usage event, so estimate from the text
+        return (self.input_tokens or self.input_estimate) + (self.output_tokens or len(self.text) // 4)
+
+    def set_stream(self, stream):
+        """Keep the open stream so cancel() can close it (closes it right away if already cancelled)"""
+        with self._lock:
+            self.stream = stream
+            if self.cancelled.is_set():
+                stream.close()
+
+    def cancel(self):
+        """
+        Stop the attempt from another thread
+        Closing the stream drops the connection even while it waits for its first event
+        """
+        with self._lock:
+            self.cancelled.set()
+            finished = self.done
+            if self.stream is not None and not finished:
+                try:
+                    self.stream.close()
+                except Exception as e:
+                    logger.debug(f"Error closing {self.label} stream: {e}")
+
+        # A loser that already finished has its full usage; otherwise it's counted when it stops
+        if finished:
+            _count_extra_tokens(self)
+
+
+def _count_extra_tokens(attempt: _Attempt):
+    with _lock:
+        hedge_stats["extra_tokens"] += attempt.tokens
+
+
+def hedge_delay() -> float:
+    """Delay before firing a hedge, from the recent first-output percentile"""
+    with _lock:
+        samples = sorted(_first_output_latencies)
+
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+
+    index = min(len(samples) - 1, int(len(samples) * HEDGE_PERCENTILE / 100))
+    return max(HEDGE_MIN_DELAY, samples[index])
+
+
+def _record_first_output(seconds: float):
+    with _lock:
+        _first_output_latencies.append(seconds)
+
+
+def _run_attempt(api, attempt: _Attempt, request: dict, finished: queue.Queue, on_first_output=None):
+    """Stream one attempt until it completes or is cancelled"""
+    try:
+        stream = api.create(model=attempt.model, stream=True, **request)
+        attempt.set_stream(stream)
+        try:
+            for event in stream:
+                if attempt.cancelled.is_set():
+                    break
+
+                if event.type == "message_start":
+                    attempt.input_tokens = event.message.usage.input_tokens
+                elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+                    if not attempt.first_output.is_set():
+                        _record_first_output(time.monotonic() - attempt.started_at)
+                        attempt.first_output.set()
+                        if on_first_output:
+                            on_first_output()
+                    attempt.parts.append(event.delta.text)
+                elif event.type == "message_delta":
+                    attempt.output_tokens = event.usage.output_tokens
+        finally:
+            # Closing the stream drops the connection, which stops generation
+            stream.close()
+    except Exception as e:
+        attempt.error = e
+    finally:
+        with attempt._lock:
+            attempt.done = True
+            cancelled = attempt.cancelled.is_set()
+        if cancelled:
+            # Counted once the loser has stopped, so it includes everything it used
+            _count_extra_tokens(attempt)
+        attempt.first_output.set()
+        finished.put(attempt)
+
+
+def _hedged_create(api, model: str, request: dict, on_first_output=None) -> str:
+    """Race a primary request against a delayed hedge and return the first to finish"""
+    finished = queue.Queue()
+    attempts = [_Attempt("primary", model)]
+    threading.Thread(
+        target=_run_attempt, args=(api, attempts[0], request, finished, on_first_output), daemon=True
+    ).start()
+
+    delay = hedge_delay()
+    if not attempts[0].first_output.wait(delay):
+        hedge = _Attempt("hedge", HEDGE_MODEL or model)
+        attempts.append(hedge)
+        threading.Thread(
+            target=_run_attempt, args=(api, hedge, request, finished, on_first_output), daemon=True
+        ).start()
+
+        with _lock:
+            hedge_stats["hedges_fired"] += 1
+        logger.info(f"No output from {model} after {delay:.1f}s, fired hedge to {hedge.model}")
+
+    # First attempt to finish successfully wins; an error only counts once all have failed
+    winner = None
+    for _ in attempts:
+        attempt = finished.get()
+        if attempt.error is None:
+            winner = attempt
+            break
+        logger.warning(f"Hedged {attempt.label} request failed: {attempt.error}")
+
+    if winner is None:
+        raise attempts[0].error
+
+    for attempt in attempts:
+        if attempt is not winner:
+            attempt.input_estimate = winner.input_tokens
+            attempt.cancel()
+
+    if winner.label == "hedge":
+        with _lock:
+            hedge_stats["hedges_won"] += 1
+
+    return winner.text
+
+
+def _create(api, model: str, request: dict, on_first_output=None) -> str:
+    if on_first_output:
+        return _streamed_create(api, model, request, on_first_output)
+
+    response = api.create(model=model, **request)
+
+    cache_read = getattr(response.usage, "cache_read_input_tokens", None)
+    if cache_read:
+        logger.info(f"Read {cache_read} prompt tokens from cache")
+
+    return response.content[0].text
+
+
+def _streamed_create(api, model: str, request: dict, on_first_output) -> str:
+    """Stream a request so on_first_output() can run as soon as the response begins"""
+    parts = []
+    stream = api.create(model=model, stream=True, **request)
+    try:
+        for event in stream:
+            if event.type == "message_start":
+                cache_read = getattr(event.message.usage, "cache_read_input_tokens", None)
+                if cache_read:
+                    logger.info(f"Read {cache_read} prompt tokens from cache")
+            elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+                if not parts:
+                    on_first_output()
+                parts.append(event.delta.text)
+    finally:
+        stream.close()
+
+    return ''.join(parts)
+
+
+def with_cache_breakpoints(system: str, messages: list) -> tuple:
+    """
+    Mark a conversation for prompt caching: the system prompt, the last
+    assistant turn (prefix already cached by the previous call) and the final
+    message (prefix for the next call)
+    Messages whose content is already a list of blocks are left as they are,
+    so callers can place their own breakpoints
+    """
+    cache_control = {"type": "ephemeral"}
+    system_blocks = [{"type": "text", "text": system, "cache_control": cache_control}]
+
+    last_assistant = max((i for i, m in enumerate(messages) if m["role"] == "assistant"), default=None)
+    marked = []
+    for i, message in enumerate(messages):
+        content = message["content"]
+        if isinstance(content, str) and i in (last_assistant, len(messages) - 1):
+            content = [{"type": "text", "text": content, "cache_control": cache_control}]
+        marked.append({"role": message["role"], "content": content})
+
+    return system_blocks, marked
+
+
+def create_message(client, model: str, system: str, messages: list, max_tokens: int,
+                   deadline=None, cache_prefix: bool = False, on_first_output=None) -> str:
+    """
+    Send a Claude request and return the response text
+    When HEDGE_ENABLED is set, a second request is fired if the first hasn't
+    produced output within the hedge delay, and the loser is cancelled
+    With cache_prefix, the system prompt and conversation are sent with cache
+    breakpoints so follow-up turns only pay for what's new
+    on_first_output() is called once the response starts streaming, which is
+    when its prompt-cache write becomes readable by other requests
+    Raises CircuitOpenError without calling out if Claude is known to be down
+    """
+    api = client.messages
+    if cache_prefix:
+        system, messages = with_cache_breakpoints(system, messages)
+        api = client.beta.prompt_caching.messages
+
+    timeout = call_timeout(deadline, REQUEST_TIMEOUT_SECONDS)
+    request = {
+        "max_tokens": max_tokens,
+        "system": system,
+        "messages": messages,
+        "timeout": timeout,
+    }
+
+    with _lock:
+        hedge_stats["requests"] += 1
+
+    call = _hedged_create if HEDGE_ENABLED else _create
+    return get_breaker("claude").call(
+        call, api, model, request, on_first_output=on_first_output, cut_short=timeout < REQUEST_TIMEOUT_SECONDS
+    )
+
+
+def get_hedge_stats() -> dict:
+    """Return hedging counters and the current hedge delay"""
+    with _lock:
+        stats = dict(hedge_stats)
+    stats["enabled"] = HEDGE_ENABLED
+    stats["delay"] = round(hedge_delay(), 3)
+    return stats
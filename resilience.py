@@ -0,0 +1,240 @@
+"""
+Resilience Helpers
+Per-job deadlines and per-dependency circuit breakers
+"""
+
+import os
+import time
+import logging
+import threading
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Total time a job may spend on extraction, generation and posting
+JOB_DEADLINE_SECONDS = float(os.environ.get("JOB_DEADLINE_SECONDS", 180))
+
+# Calls aren't attempted with less time than this left (they could only time out)
+MIN_CALL_SECONDS = float(os.environ.get("MIN_CALL_SECONDS", 1.0))
+
+# Consecutive failures before a breaker opens, and how long it stays open
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_RESET_SECONDS = float(os.environ.get("BREAKER_RESET_SECONDS", 60))
+
+# Friendly names for dependencies in user-facing messages
+DEPENDENCY_LABELS = {
+    "claude": "Claude",
+    "gemini": "Gemini",
+    "slack": "Slack",
+}
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a job runs out of time"""
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because its dependency is known-bad"""
+
+    def __init__(self, breaker):
+        self.breaker = breaker
+        super().__init__(breaker.outage_message())
+
+
+class Deadline:
+    """Absolute deadline for a job, passed down to every stage"""
+
+    def __init__(self, seconds: float = JOB_DEADLINE_SECONDS):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left, never negative"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: float) -> float:
+        """
+        Timeout for the next call: the smaller of cap and the time left
+        Raises DeadlineExceeded if less than MIN_CALL_SECONDS is left
+        """
+        remaining = self.remaining()
+        if remaining < MIN_CALL_SECONDS:
+            raise DeadlineExceeded("Job deadline exceeded")
+        return min(cap, remaining)
+
+
+def call_timeout(deadline, cap: float) -> float:
+    """
+    Timeout for a call that may or may not run under a deadline
+    A result below cap means the deadline cut it short: pass cut_short=True
+    to the breaker so a timeout then isn't blamed on the dependency
+    """
+    return deadline.timeout(cap) if deadline else cap
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one dependency
+    Opens after consecutive failures, then lets a single trial call through
+    once the reset period has passed
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def label(self) -> str:
+        if self.name.startswith("web:"):
+            return self.name[4:]
+        return DEPENDENCY_LABELS.get(self.name, self.name)
+
+    def retry_in(self) -> float:
+        """Seconds until a trial call is allowed"""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def is_open(self) -> bool:
+        """True while calls are being refused"""
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            return self.retry_in() > 0 or self._trial_in_flight
+
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if self.is_open() else "half_open"
+
+    def outage_message(self) -> str:
+        return f"{self.label} is having problems right now. Please try again in about {int(self.retry_in()) + 1} seconds."
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call should not be attempted"""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if self.retry_in() > 0 or self._trial_in_flight:
+                raise CircuitOpenError(self)
+            # Half-open: let one trial through
+            self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info(f"Circuit breaker for {self.name} closed")
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Circuit breaker for {self.name} opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+
+    def record_inconclusive(self):
+        """The call said nothing about the dependency's health (e.g. we cut it short)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record(self, error: Exception = None, cut_short: bool = False):
+        """
+        Record the outcome of a call; client errors don't count against the dependency
+        Neither do timeouts when our own deadline made the timeout shorter than usual
+        """
+        if error is not None and cut_short and is_timeout(error):
+            self.record_inconclusive()
+        elif error is None or not is_dependency_failure(error):
+            self.record_success()
+        else:
+            self.record_failure()
+
+    def call(self, func, *args, cut_short: bool = False, **kwargs):
+        """
+        Call func through the breaker
+        cut_short says the call's timeout was reduced by a job deadline or budget
+        """
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.record(e, cut_short)
+            raise
+        self.record_success()
+        return result
+
+
+def is_dependency_failure(error: Exception) -> bool:
+    """
+    True for errors that say the dependency is unhealthy (timeouts, connection
+    errors, 429s and 5xx), False for our own bad requests (other 4xx)
+    """
+    if isinstance(error, (DeadlineExceeded, CircuitOpenError)):
+        return False
+    status = getattr(error, "status_code", None)
+    if status is None and isinstance(getattr(error, "code", None), int):
+        # Gemini errors carry the HTTP status as `code`
+        status = error.code
+    if status is None:
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+    if status is None:
+        return True
+    return status == 429 or status >= 500
+
+
+def is_timeout(error: Exception) -> bool:
+    """True for timeouts from any client library (requests, httpx, anthropic, google-genai)"""
+    while error is not None:
+        if isinstance(error, TimeoutError) or "timeout" in type(error).__name__.lower():
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+# Web hosts are unbounded, so healthy breakers are dropped past this size
+MAX_BREAKERS = 500
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Return the shared breaker for a dependency"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            if len(_breakers) >= MAX_BREAKERS:
+                for key in [k for k, b in _breakers.items() if not b.failures and b.opened_at is None]:
+                    del _breakers[key]
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def web_breaker_name(url: str) -> str:
+    """Breaker name for an arbitrary web host"""
+    return f"web:{urlparse(url).netloc.lower()}"
+
+
+def breaker_states() -> dict:
+    """Return state and failure counts of every breaker that isn't idle"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {
+        breaker.name: {"state": breaker.state(), "failures": breaker.failures}
+        for breaker in breakers
+        if breaker.failures or breaker.opened_at is not None
+    }
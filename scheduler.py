@@ -0,0 +1,199 @@
+"""
+Job Scheduler
+Runs bot work on background workers with priority classes and per-channel/per-user fair queuing
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+# Priority classes (lower runs first)
+PRIORITY_INTERACTIVE = 0   # Button clicks that only need an LLM call
+PRIORITY_BACKGROUND = 1    # Content extraction from URLs, PDFs and videos
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BACKGROUND: "background",
+}
+
+# Number of recent wait times kept per class for percentiles
+WAIT_SAMPLE_SIZE = 500
+
+
+class Scheduler:
+    """
+    Priority scheduler with fair queuing between channel/user keys
+    Within a priority class, keys are served round-robin so one user
+    sharing ten PDFs can't starve everyone else in the channel
+    """
+
+    def __init__(self, workers: int = 4, max_queue_depth: int = 50, max_per_key: int = 10):
+        self.workers = workers
+        self.max_queue_depth = max_queue_depth
+        self.max_per_key = max_per_key
+
+        self._cond = threading.Condition()
+        # {priority: OrderedDict{key: deque[job]}} - OrderedDict order is the round-robin order
+        self._queues = {priority: OrderedDict() for priority in PRIORITY_NAMES}
+        self._depth = 0
+        self._idle = 0
+        self._threads = []
+
+        self._stats = {
+            name: {
+                "submitted": 0,
+                "completed": 0,
+                "failed": 0,
+                "rejected": 0,
+                "waits": deque(maxlen=WAIT_SAMPLE_SIZE),
+                "max_wait": 0.0,
+            }
+            for name in PRIORITY_NAMES.values()
+        }
+
+    def _start_workers(self):
+        """Start worker threads on first use (after gunicorn has forked)"""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"scheduler-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._idle = self.workers
+
+    def submit(self, priority: int, key: str, func, *args, **kwargs):
+        """
+        Queue a job for execution
+        Returns 0 if a worker picks it up right away, its queue position (1-based)
+        if it has to wait, or None if the queue is full
+        """
+        name = PRIORITY_NAMES[priority]
+
+        with self._cond:
+            self._start_workers()
+
+            queue = self._queues[priority].get(key)
+            if self._depth >= self.max_queue_depth or (queue and len(queue) >= self.max_per_key):
+                self._stats[name]["rejected"] += 1
+                logger.warning(f"Scheduler queue full, rejected {name} job for {key}")
+                return None
+
+            if queue is None:
+                queue = self._queues[priority][key] = deque()
+
+            queue.append({
+                "func": func,
+                "args": args,
+                "kwargs": kwargs,
+                "priority": priority,
+                "key": key,
+                "queued_at": time.monotonic(),
+            })
+            self._depth += 1
+            self._stats[name]["submitted"] += 1
+
+            position = self._position(priority, key)
+            starts_now = position <= self._idle
+
+            self._cond.notify()
+
+        return 0 if starts_now else position
+
+    def _position(self, priority: int, key: str) -> int:
+        """Estimate where the newest job for key sits in the overall run order"""
+        position = 0
+
+        # Everything in higher priority classes runs first
+        for higher in PRIORITY_NAMES:
+            if higher < priority:
+                position += sum(len(q) for q in self._queues[higher].values())
+
+        # Within the class, each other key gets at most as many turns as we need
+        turns = len(self._queues[priority][key])
+        for other_key, queue in self._queues[priority].items():
+            if other_key != key:
+                position += min(len(queue), turns)
+
+        return position + turns
+
+    def _next_job(self):
+        """Pop the next job: highest priority class first, round-robin across keys"""
+        for priority in sorted(self._queues):
+            queues = self._queues[priority]
+            if not queues:
+                continue
+
+            key, queue = next(iter(queues.items()))
+            job = queue.popleft()
+            if queue:
+                queues.move_to_end(key)
+            else:
+                del queues[key]
+
+            self._depth -= 1
+            return job
+        return None
+
+    def _worker(self):
+        """Worker loop"""
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+                self._idle -= 1
+
+            name = PRIORITY_NAMES[job["priority"]]
+            wait = time.monotonic() - job["queued_at"]
+
+            try:
+                job["func"](*job["args"], **job["kwargs"])
+                outcome = "completed"
+            except Exception as e:
+                logger.error(f"Scheduled {name} job for {job['key']} failed: {e}")
+                outcome = "failed"
+
+            with self._cond:
+                stats = self._stats[name]
+                stats[outcome] += 1
+                stats["waits"].append(wait)
+                stats["max_wait"] = max(stats["max_wait"], wait)
+                self._idle += 1
+
+    def metrics(self) -> dict:
+        """Return queue depth and wait-time metrics per priority class"""
+        with self._cond:
+            result = {
+                "workers": self.workers,
+                "idle_workers": self._idle,
+                "queue_depth": self._depth,
+                "classes": {},
+            }
+
+            for priority, name in PRIORITY_NAMES.items():
+                stats = self._stats[name]
+                waits = sorted(stats["waits"])
+                result["classes"][name] = {
+                    "queued": sum(len(q) for q in self._queues[priority].values()),
+                    "submitted": stats["submitted"],
+                    "completed": stats["completed"],
+                    "failed": stats["failed"],
+                    "rejected": stats["rejected"],
+                    "wait_p50": _percentile(waits, 50),
+                    "wait_p95": _percentile(waits, 95),
+                    "wait_max": round(stats["max_wait"], 3),
+                }
+
+            return result
+
+
+def _percentile(sorted_values: list, percentile: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percentile / 100))
+    return round(sorted_values[index], 3)
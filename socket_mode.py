@@ -0,0 +1,60 @@
+"""
+Socket Mode Runner
+Receives Slack events over one persistent WebSocket instead of the HTTP endpoints
+"""
+
+import os
+import logging
+import threading
+from slack_sdk.socket_mode import SocketModeClient
+from slack_sdk.socket_mode.request import SocketModeRequest
+from slack_sdk.socket_mode.response import SocketModeResponse
+from app import slack_client, dispatch_event_callback, dispatch_interaction, dispatch_slash_command, start_job_recovery
+
+logger = logging.getLogger(__name__)
+
+
+def handle_socket_mode_request(client: SocketModeClient, req: SocketModeRequest):
+    """Ack the envelope straight away, then route it to the same handlers as HTTP"""
+    if req.type == "slash_commands":
+        # Slash command replies travel in the ack (the lookup is a quick index query)
+        response = dispatch_slash_command(req.payload)
+        client.send_socket_mode_response(SocketModeResponse(envelope_id=req.envelope_id, payload=response))
+        return
+
+    client.send_socket_mode_response(SocketModeResponse(envelope_id=req.envelope_id))
+
+    if req.type == "events_api":
+        dispatch_event_callback(req.payload)
+    elif req.type == "interactive":
+        dispatch_interaction(req.payload)
+
+
+def create_socket_mode_client(app_token: str = None, wss_url: str = None) -> SocketModeClient:
+    """
+    Build a Socket Mode client wired to the bot's handlers
+    Pass wss_url to connect to a local WebSocket stand-in instead of Slack
+    """
+    client = SocketModeClient(
+        app_token=app_token or os.environ.get("SLACK_APP_TOKEN"),
+        web_client=slack_client
+    )
+    if wss_url:
+        # Skips apps.connections.open on the first connect
+        client.wss_uri = wss_url
+
+    client.socket_mode_request_listeners.append(handle_socket_mode_request)
+    return client
+
+
+def run_socket_mode(app_token: str = None, wss_url: str = None):
+    """Connect and serve events until the process is stopped"""
+    start_job_recovery()
+    client = create_socket_mode_client(app_token, wss_url)
+    client.connect()
+    logger.info("Socket Mode connected, waiting for events")
+    threading.Event().wait()
+
+
+if __name__ == "__main__":
+    run_socket_mode(wss_url=os.environ.get("SLACK_SOCKET_MODE_URL"))
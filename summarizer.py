@@ -0,0 +1,159 @@
+"""
+Long Document Summarizer
+Map-reduce digest of long PDFs and articles so drafts are based on the whole document
+"""
+
+import os
+import math
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from resilience import Deadline, get_breaker, call_timeout, MIN_CALL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Content longer than this is condensed (matches what the drafting prompt can take)
+LONG_DOCUMENT_THRESHOLD = 8000
+
+# Cheaper/faster model used for the map step
+SUMMARY_MODEL = os.environ.get("SUMMARY_MODEL", "claude-3-5-haiku-20241022")
+
+# Chunking limits
+CHUNK_SIZE = 12000
+MAX_CHUNKS = 16
+
+# Parallel summaries in flight and total time allowed for the map step
+SUMMARY_CONCURRENCY = int(os.environ.get("SUMMARY_CONCURRENCY", 8))
+SUMMARY_BUDGET_SECONDS = float(os.environ.get("SUMMARY_BUDGET_SECONDS", 20))
+
+# Timeout of a single chunk summary request (also capped by what's left of the budget)
+SUMMARY_REQUEST_TIMEOUT_SECONDS = float(os.environ.get("SUMMARY_REQUEST_TIMEOUT_SECONDS", 15))
+
+# Size of the raw excerpt used when a chunk summary misses the budget
+FALLBACK_EXCERPT_CHARS = 400
+
+
+def chunk_text(text: str, chunk_size: int = CHUNK_SIZE) -> list:
+    """
+    Split text into chunks of roughly chunk_size characters
+    Prefers to break at the end of a sentence
+    """
+    chunks = []
+    start = 0
+
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+
+        if end < len(text):
+            # Look back for a sentence boundary in the last 20% of the chunk
+            boundary = text.rfind('. ', start + int(chunk_size * 0.8), end)
+            if boundary != -1:
+                end = boundary + 1
+
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = end
+
+    return chunks
+
+
+def _trim(text: str, max_chars: int) -> str:
+    """Cut text to max_chars at a word boundary"""
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars - 3].rsplit(' ', 1)[0] + "..."
+
+
+def summarize_chunk(client, chunk: str, part: int, total: int, max_chars: int, budget: Deadline) -> str:
+    """Summarize one chunk of a long document with the fast model, in at most max_chars"""
+    # Ask for fewer words than fit (~7 characters each) since models overshoot; the rest is trimmed
+    max_words = max(20, max_chars // 9)
+    # Chunks waiting for a free slot start later, so each gets what's left of the budget
+    timeout = call_timeout(budget, SUMMARY_REQUEST_TIMEOUT_SECONDS)
+    response = get_breaker("claude").call(
+        client.messages.create,
+        cut_short=timeout < SUMMARY_REQUEST_TIMEOUT_SECONDS,
+        model=SUMMARY_MODEL,
+        timeout=timeout,
+        max_tokens=max(64, max_chars // 3),
+        messages=[
+            {
+                "role": "user",
+                "content": f"""This is part {part} of {total} of a long document. Summarize it in at most {max_words} words.
+
+Keep the specific numbers, named examples, strong claims and quotable lines - they will be used to write LinkedIn posts about the document.
+
+PART {part}:
+{chunk}"""
+            }
+        ]
+    )
+    return _trim(response.content[0].text.strip(), max_chars)
+
+
+def condense_content(content: str, client, deadline=None) -> str:
+    """
+    Condense long content into a digest that fits the drafting prompt
+    (at most LONG_DOCUMENT_THRESHOLD characters, headers included)
+    Short content is returned unchanged. Chunks are summarized in parallel;
+    any chunk that misses the latency budget is represented by a short excerpt
+    """
+    if not content or len(content) <= LONG_DOCUMENT_THRESHOLD:
+        return content
+
+    # Leave at least half of what's left of the job for drafting
+    budget = SUMMARY_BUDGET_SECONDS
+    if deadline:
+        budget = min(budget, deadline.remaining() / 2)
+
+    # Sentence-boundary cuts make chunks shorter than chunk_size, so grow it until the cap holds
+    chunk_size = max(CHUNK_SIZE, math.ceil(len(content) / MAX_CHUNKS))
+    chunks = chunk_text(content, chunk_size)
+    while len(chunks) > MAX_CHUNKS:
+        chunk_size = math.ceil(chunk_size * 1.1)
+        chunks = chunk_text(content, chunk_size)
+    total = len(chunks)
+
+    # Share the drafting prompt's space between the parts, after the digest and part headers
+    header = f"# Document digest ({total} parts, {len(content)} characters in full)\n\n"
+    overhead = len(header) + total * len(f"## Part {total} of {total}\n\n\n")
+    max_chars = (LONG_DOCUMENT_THRESHOLD - overhead) // total
+
+    logger.info(f"Condensing {len(content)} characters in {total} parts")
+
+    summaries = [None] * total
+    if budget < MIN_CALL_SECONDS:
+        # Requests this short could only time out, so go straight to excerpts
+        logger.warning(f"No time left to summarize {total} parts, using excerpts")
+    else:
+        budget_deadline = Deadline(budget)
+        executor = ThreadPoolExecutor(max_workers=SUMMARY_CONCURRENCY)
+        futures = [
+            executor.submit(summarize_chunk, client, chunk, i + 1, total, max_chars, budget_deadline)
+            for i, chunk in enumerate(chunks)
+        ]
+        done, not_done = wait(futures, timeout=budget)
+
+        # Don't hold the caller up for stragglers
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        for i, future in enumerate(futures):
+            if future in done:
+                try:
+                    summaries[i] = future.result()
+                except Exception as e:
+                    logger.error(f"Error summarizing part {i + 1}/{total}: {e}")
+
+    sections = []
+    missed = 0
+    for i, summary in enumerate(summaries):
+        if not summary:
+            missed += 1
+            summary = _trim(f"(excerpt) {chunks[i][:FALLBACK_EXCERPT_CHARS]}...", max_chars)
+
+        sections.append(f"## Part {i + 1} of {total}\n{summary}")
+
+    if missed:
+        logger.warning(f"{missed}/{total} parts fell back to excerpts")
+
+    return header + '\n\n'.join(sections)
@@ -0,0 +1,161 @@
+"""
+Voice Registry
+Loads voice prompts from voices/*.md, versions them by content hash and hot-reloads on change
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+VOICES_DIR = os.environ.get("VOICES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "voices"))
+
+# How often the directory is checked for edits (seconds)
+RELOAD_CHECK_SECONDS = float(os.environ.get("VOICES_RELOAD_SECONDS", 2))
+
+DEFAULT_VOICE = os.environ.get("DEFAULT_VOICE", "zoran")
+
+# Draft variants for voices that don't list their own
+DEFAULT_VARIANTS = [
+    {"name": "Version A", "angle": "More insight-focused (lead with the key learning/observation)"},
+    {"name": "Version B", "angle": "More engagement-focused (end with a genuine question)"},
+]
+
+
+def parse_voice_file(voice_id: str, text: str) -> dict:
+    """
+    Parse a voice file: a front matter block of `key: value` lines between
+    `---` markers, followed by the system prompt
+    Each `variant: Name | angle` line adds a draft variant, generated in parallel
+    """
+    meta = {}
+    variants = []
+    prompt = text
+
+    if text.startswith("---\n"):
+        header, _, prompt = text[4:].partition("\n---\n")
+        for line in header.splitlines():
+            key, sep, value = line.partition(":")
+            if not sep:
+                continue
+            if key.strip() == "variant":
+                name, _, angle = value.partition("|")
+                variants.append({"name": name.strip(), "angle": angle.strip()})
+            else:
+                meta[key.strip()] = value.strip()
+
+    prompt = prompt.strip()
+
+    return {
+        "id": voice_id,
+        "label": meta.get("label", voice_id),
+        "button": meta.get("button", meta.get("label", voice_id)),
+        "order": int(meta.get("order", 100)),
+        "meta": meta,
+        "variants": variants or DEFAULT_VARIANTS,
+        "prompt": prompt,
+        "version": hashlib.sha256(text.encode()).hexdigest()[:12],
+        # Rough estimate until the exact count comes back
+        "tokens": len(prompt) // 4,
+        "tokens_exact": False,
+    }
+
+
+class VoiceRegistry:
+    """
+    Voices loaded from a directory of .md files
+    Files are re-read when their modification time or size changes, checked at
+    most every RELOAD_CHECK_SECONDS, so prompt edits apply without a restart
+    """
+
+    def __init__(self, directory: str = VOICES_DIR, token_counter=None):
+        self.directory = directory
+        self.token_counter = token_counter
+        self._voices = {}
+        self._stamps = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        """Reload added, changed and removed voice files"""
+        now = time.monotonic()
+        if now - self._checked_at < RELOAD_CHECK_SECONDS:
+            return
+        self._checked_at = now
+
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith(".md") and e.is_file()]
+        except OSError as e:
+            logger.error(f"Error reading voices directory {self.directory}: {e}")
+            return
+
+        seen = set()
+        for entry in entries:
+            voice_id = entry.name[:-3]
+            seen.add(voice_id)
+            stat = entry.stat()
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if self._stamps.get(voice_id) == stamp:
+                continue
+
+            try:
+                with open(entry.path, encoding="utf-8") as f:
+                    voice = parse_voice_file(voice_id, f.read())
+            except Exception as e:
+                logger.error(f"Error loading voice {entry.path}: {e}")
+                continue
+
+            previous = self._voices.get(voice_id)
+            self._stamps[voice_id] = stamp
+            if previous and previous["version"] == voice["version"]:
+                continue
+
+            self._voices[voice_id] = voice
+            logger.info(f"Loaded voice {voice_id} version {voice['version']} (~{voice['tokens']} tokens)")
+
+            if self.token_counter:
+                threading.Thread(target=self._count_tokens, args=(voice,), daemon=True).start()
+
+        for voice_id in set(self._voices) - seen:
+            del self._voices[voice_id]
+            self._stamps.pop(voice_id, None)
+            logger.info(f"Removed voice {voice_id}")
+
+    def _count_tokens(self, voice: dict):
+        """Replace the estimate with an exact token count"""
+        try:
+            voice["tokens"] = self.token_counter(voice["prompt"])
+            voice["tokens_exact"] = True
+        except Exception as e:
+            logger.warning(f"Couldn't count tokens for voice {voice['id']}: {e}")
+
+    def get(self, voice_id: str) -> dict:
+        """Return a voice, falling back to the default (or any) voice for unknown ids"""
+        with self._lock:
+            self._refresh()
+            voice = self._voices.get(voice_id) or self._voices.get(DEFAULT_VOICE)
+            if voice is None and self._voices:
+                voice = self._sorted()[0]
+            return voice
+
+    def _sorted(self) -> list:
+        return sorted(self._voices.values(), key=lambda v: (v["order"], v["id"]))
+
+    def all(self) -> list:
+        """Return all voices in button order"""
+        with self._lock:
+            self._refresh()
+            return self._sorted()
+
+    def summary(self) -> dict:
+        """Version and token count of each loaded voice"""
+        return {
+            voice["id"]: {"version": voice["version"], "tokens": voice["tokens"], "tokens_exact": voice["tokens_exact"]}
+            for voice in self.all()
+        }
+
+
+registry = VoiceRegistry()